@@ -1,17 +1,26 @@
 import os
 import streamlit as st
 import pandas as pd
-import plotly.express as px
 from datetime import date
-import gspread
-from oauth2client.service_account import ServiceAccountCredentials
 import json
+import hashlib
 import time
-import textwrap
+import random
+import sqlite3
+import threading
 import tempfile
-import requests
-import base64
-from io import BytesIO
+import hmac
+
+from rubricas import (
+    RUBRICAS, obtener_rubrica, obtener_preguntas,
+    normalizar_encabezados, fila_para_encabezados, PREGUNTAS_POR_ID
+)
+import metricas
+
+# Dependencias pesadas (plotly, gspread, pyarrow, xlsxwriter, Gemini) se importan
+# dentro de las funciones que las usan: cada página carga solo lo suyo la primera vez.
+
+inicio_rerun = time.perf_counter()
 
 # ===============================
 # CONFIGURACIÓN PRINCIPAL
@@ -68,11 +77,6 @@ html, body, .stApp {
     font-weight: 700;
     font-size: 1.2rem;
 }
-</style>
-""", unsafe_allow_html=True)
-
-st.markdown("""
-<style>
 .card {
     background-color: #ffffff;
     padding: 1.2rem 1.4rem;
@@ -134,125 +138,6 @@ areas = {
     }
 }
 
-# ===============================
-# PREGUNTAS POR CANAL (FUENTE ÚNICA)
-# ===============================
-def obtener_preguntas(area, canal):
-    if area == "Casa UR":
-
-        if canal in ["Presencial", "Contact Center"]:
-            return [
-                "¿Atiende la interacción en el momento que se establece contacto con el(a) usuario(a)?",
-                "¿Saluda, se presenta de una forma amable y cortés, usando el dialogo de saludo y bienvenida?",
-                "¿Realiza la validación de identidad del usuario y personaliza la interacción de forma adecuada garantizando la confidencialidad de la información?",
-                "¿Escucha activamente al usuario y realiza preguntas adicionales demostrando atención y concentración?",
-                "¿Consulta todas las herramientas disponibles para estructurar la posible respuesta que se le brindará al usuario?",
-                "¿Controla los tiempos de espera informando al usuario y realizando acompañamiento cada 2 minutos?",
-                "¿Brinda respuesta de forma precisa, completa y coherente, de acuerdo a lo solicitado por el usuario?",
-                "¿Valida con el usuario si la información fue clara, completa o si requiere algún trámite adicional?",
-                "¿Documenta la atención de forma coherente según lo solicitado e informado al cliente; seleccionando las tipologías adecuadas y manejando correcta redacción y ortografía?",
-                "¿Finaliza la atención de forma amable, cortés utilizando el dialogo de cierre y despedida remitiendo al usuario a responder la encuesta de percepción?"
-            ]
-
-        elif canal == "Chat":
-            return [
-                "¿Escucha activamente al usuario y realiza preguntas adicionales demostrando atención y concentración?",
-                "¿Consulta todas las herramientas disponibles para estructurar la posible respuesta que se le brindará al usuario?",
-                "¿Controla los tiempos de espera informando al usuario y realizando acompañamiento cada 2 minutos?",
-                "¿Brinda respuesta de forma precisa, completa y coherente, de acuerdo a lo solicitado por el usuario?",
-                "¿Valida con el usuario si la información fue clara, completa o si requiere algún trámite adicional?",
-                "¿Documenta la atención de forma coherente según lo solicitado e informado al cliente; seleccionando las tipologías adecuadas y manejando correcta redacción y ortografía?"
-            ]
-
-        elif canal == "Back Office":
-            return [
-                "¿Cumple con el ANS establecido para el servicio?",
-                "¿Analiza correctamente la solicitud?",
-                "¿Gestiona adecuadamente en SAP/UXXI/Bizagi?",
-                "¿Respuesta eficaz de acuerdo a la solicitud radicada por el usuario?",
-                "¿Es empático al cerrar la solicitud?"
-            ]
-        elif canal == "Servicio":
-            return [
-                "¿Atiende la interacción en el momento que se establece contacto con el(a) usuario(a)?",
-                "¿Saluda, se presenta de una forma amable y cortés, usando el dialogo de saludo y bienvenida?",
-                "¿Realiza la validación de identidad del usuario y personaliza la interacción de forma adecuada garantizando la confidencialidad de la información?",
-                "¿Escucha activamente al usuario y realiza preguntas adicionales demostrando atención y concentración?",
-                "¿Controla los tiempos de espera informando al usuario y realizando acompañamiento cada 2 minutos?",
-                "¿Valida con el usuario si la información fue clara, completa o si requiere algún trámite adicional?",
-                "¿Finaliza la atención de forma amable, cortés utilizando el dialogo de cierre y despedida remitiendo al usuario a responder la encuesta de percepción?"
-            ]
-
-    elif area == "Conecta UR":
-
-        if canal == "Linea":
-            return [
-                "¿Atiende la interacción de forma oportuna en el momento que se establece el contacto?",
-                "¿Saluda y se presenta de manera amable y profesional, estableciendo un inicio cordial de la atención?",
-                "¿Realiza la validación de identidad del usuario garantizando confidencialidad y aplica protocolos de seguridad de la información?",
-                "¿Escucha activamente al usuario y formula preguntas pertinentes para un diagnóstico claro y completo?",
-                "¿Consulta y utiliza todas las herramientas de soporte disponibles (base de conocimiento, sistemas, documentación) para estructurar una respuesta adecuada?",
-                "¿Gestiona adecuadamente los tiempos de espera, manteniendo informado al usuario y realizando acompañamiento oportuno durante la interacción?",
-                "¿Sigue el flujo definido para solución o escalamiento, asegurando trazabilidad y cumplimiento de procesos internos?",
-                "¿Valida con el usuario que la información brindada es clara, completa y confirma si requiere trámites o pasos adicionales?",
-                "¿Documenta la atención en el sistema de tickets de manera coherente, seleccionando tipologías correctas y con redacción/ortografía adecuadas?",
-                "¿Finaliza la atención de forma amable y profesional, utilizando el cierre de interacción definido y remitiendo al usuario a la encuesta de satisfacción?"
-            ]
-
-        elif canal == "Chat":
-            return [
-                "¿Escucha activamente al usuario y formula preguntas pertinentes para un diagnóstico claro y completo?",
-                "¿Consulta y utiliza todas las herramientas de soporte disponibles (base de conocimiento, sistemas, documentación) para estructurar una respuesta adecuada?",
-                "¿Gestiona adecuadamente los tiempos de espera, manteniendo informado al usuario y realizando acompañamiento oportuno durante la interacción?",
-                "¿Sigue el flujo definido para solución o escalamiento, asegurando trazabilidad y cumplimiento de procesos internos?",
-                "¿Valida con el usuario que la información brindada es clara, completa y confirma si requiere trámites o pasos adicionales?",
-                "¿Documenta la atención en el sistema de tickets de manera coherente, seleccionando tipologías correctas y con redacción/ortografía adecuadas?"
-            ]
-
-        elif canal == "Sitio":
-            return [
-                "¿Cómo califica el tiempo de respuesta de su solicitud?",
-                "¿Cómo califica la amabilidad y la actitud de servicio del técnico durante la atención brindada?",
-                "¿Cómo califica la presentación personal del técnico, incluyendo el uso adecuado de la chaqueta institucional, durante la visita?",
-                "¿El Tecnico de soporte en sitio logró solucionar su requerimiento en esta visita?",
-                "¿Qué probabilidad hay de que recomiendes los servicios de CONECTA UR a tus compañeros y amigos?"
-            ]
-        if canal == "Servicio":
-            return [
-                "¿Atiende la interacción en el momento que se establece contacto con el(a) usuario(a)?",
-                "¿Saluda, se presenta de una forma amable y cortés, usando el dialogo de saludo y bienvenida?",
-                "¿Realiza la validación de identidad del usuario y personaliza la interacción de forma adecuada garantizando la confidencialidad de la información?",
-                "¿Escucha activamente al usuario y realiza preguntas adicionales demostrando atención y concentración?",
-                "¿Controla los tiempos de espera informando al usuario y realizando acompañamiento cada 2 minutos?",
-                "¿Valida con el usuario si la información fue clara, completa o si requiere algún trámite adicional?",
-                "¿Finaliza la atención de forma amable, cortés utilizando el dialogo de cierre y despedida remitiendo al usuario a responder la encuesta de percepción?"
-            ]
-
-# ===============================
-# PESOS POR CANAL
-# ===============================
-def obtener_pesos(area, canal):
-    if area == "Casa UR":
-        if canal in ["Presencial", "Contact Center"]:
-            return [9, 9, 9, 9, 9, 9, 14, 8, 14, 10]
-        elif canal == "Chat":
-            return [20, 15, 15, 15, 15, 20]
-        elif canal == "Back Office":
-            return [20, 20, 20, 20, 20]
-        elif canal == "Servicio":
-            return [15, 15, 15, 15, 10, 15, 15]
-
-    if area == "Conecta UR":
-        if canal == "Linea":
-            return [9, 9, 9, 9, 9, 9, 14, 8, 14, 10]
-        elif canal == "Chat":
-            return [20, 15, 15, 15, 15, 20]
-        elif canal == "Sitio":
-            return [20, 20, 20, 20, 20]
-        elif canal == "Servicio":
-            return [15, 15, 15, 15, 10, 15, 15]
-    return []
-
 # ===============================
 # PESO GLOBAL POR CANAL (RESULTADO FINAL)
 # ===============================
@@ -263,11 +148,6 @@ PESO_OTROS_CANALES = 0.70
 # ===============================
 # SOPORTE WRAP PLOTLY
 # ===============================
-def envolver_pregunta(texto: str, ancho: int = 45) -> str:
-    if not isinstance(texto, str):
-        return str(texto)
-    return "<br>".join(textwrap.wrap(texto.strip(), width=ancho, break_long_words=False))
-
 def _lineas_wrap(s: str) -> int:
     if not isinstance(s, str) or not s:
         return 1
@@ -311,156 +191,1032 @@ def ajustar_grafico_horizontal(fig, df_plot: pd.DataFrame, col_wrapped: str = "P
 # Calculos Por Canal
 # ===============================
 
-def calcular_ponderado_por_asesor(df_asesor):
+@metricas.medir("ponderado")
+def calcular_puntajes_ponderados(datos):
     """
-    Ponderación final por asesor:
-    - Servicio: 30 %
-    - Otros canales: 70 %
-    Usa la columna 'Total'
+    Puntaje final de todos los asesores a la vez (tabla Asesor → Puntaje ponderado):
+    - Servicio: PESOS_GLOBALES_CANAL["Servicio"] (30 %)
+    - Otros canales: PESO_OTROS_CANALES (70 %)
+    Si el asesor solo tiene uno de los dos grupos, se usa ese promedio.
+    Acepta el cubo agregado (Suma Total / Monitoreos) o filas con la columna 'Total'.
     """
+    if "Suma Total" not in datos.columns:
+        datos = datos.assign(**{
+            "Suma Total": pd.to_numeric(datos["Total"], errors="coerce").fillna(0),
+            "Monitoreos": 1
+        })
+
+    grupo = datos["Canal"].eq("Servicio").map({True: "Servicio", False: "Otros"}).rename("Grupo")
+    sumas = datos.groupby(["Asesor", grupo])[["Suma Total", "Monitoreos"]].sum()
+
+    promedios = (
+        (sumas["Suma Total"] / sumas["Monitoreos"])
+        .unstack("Grupo")
+        .reindex(columns=["Servicio", "Otros"])
+    )
+
+    combinado = (
+        promedios["Servicio"] * PESOS_GLOBALES_CANAL["Servicio"]
+        + promedios["Otros"] * PESO_OTROS_CANALES
+    )
 
-    if df_asesor.empty:
-        return 0.0
+    puntaje = (
+        combinado
+        .fillna(promedios["Servicio"])
+        .fillna(promedios["Otros"])
+        .fillna(0.0)
+        .round(2)
+    )
 
-    # 🔥 Forzar Total a numérico
-    df_asesor["Total"] = pd.to_numeric(
-        df_asesor["Total"], errors="coerce"
-    ).fillna(0)
+    return puntaje.rename("Puntaje ponderado").reset_index()
 
-    servicio = df_asesor[df_asesor["Canal"] == "Servicio"]["Total"]
-    otros = df_asesor[df_asesor["Canal"] != "Servicio"]["Total"]
+# ===============================
+# GOOGLE SHEETS: CONEXIÓN COMPARTIDA
+# ===============================
+SCOPE_GOOGLE = [
+    "https://spreadsheets.google.com/feeds",
+    "https://www.googleapis.com/auth/drive"
+]
 
-    promedio_servicio = servicio.mean() if not servicio.empty else None
-    promedio_otros = otros.mean() if not otros.empty else None
+# ===============================
+# GOOGLE SHEETS: LIMITADOR DE CUOTA (TOKEN BUCKET)
+# ===============================
+SHEETS_LLAMADAS_POR_MIN = 50   # por debajo de la cuota de 60 lecturas/min por usuario
+SHEETS_RAFAGA = 10             # llamadas seguidas permitidas con el cubo lleno
+SHEETS_REINTENTOS = 5
+SHEETS_ESPERA_MAX_SEG = 64
 
-    if promedio_servicio is not None and promedio_otros is not None:
-        return round((promedio_servicio * 0.30) + (promedio_otros * 0.70), 2)
+class LimitadorSheets:
+    """
+    Cubo de fichas compartido por todas las sesiones e hilos del proceso
+    (formulario, dashboards, despachador del outbox):
+    - cada llamada toma una ficha; sin fichas, espera su turno
+    - 429: vacía el cubo y reintenta con backoff exponencial y jitter
+    - 5xx: reintenta igual, pero solo peticiones idempotentes (lecturas); un
+      append con 5xx pudo haberse escrito, así que se lanza y lo reintenta el outbox
+    - contadores para ver cuánto se está frenando
+    """
+    def __init__(self, por_minuto, rafaga):
+        self._lock = threading.Lock()
+        self.tasa = por_minuto / 60.0
+        self.capacidad = rafaga
+        self._fichas = float(rafaga)
+        self._ultimo = time.monotonic()
+        self.contadores = {
+            "llamadas": 0,
+            "frenadas": 0,
+            "segundos_frenado": 0.0,
+            "reintentos": 0,
+            "errores_429": 0,
+            "errores_5xx": 0,
+            "fallidas": 0
+        }
 
-    if promedio_servicio is not None:
-        return round(promedio_servicio, 2)
+    def tomar(self):
+        with self._lock:
+            ahora = time.monotonic()
+            self._fichas = min(self.capacidad, self._fichas + (ahora - self._ultimo) * self.tasa)
+            self._ultimo = ahora
+            self._fichas -= 1
+            espera = max(0.0, -self._fichas / self.tasa)
+            self.contadores["llamadas"] += 1
+            if espera:
+                self.contadores["frenadas"] += 1
+                self.contadores["segundos_frenado"] += espera
+        time.sleep(espera)
+
+    def ejecutar(self, funcion, *args, idempotente=True, **kwargs):
+        from gspread.exceptions import APIError
+
+        for intento in range(SHEETS_REINTENTOS + 1):
+            self.tomar()
+            try:
+                return funcion(*args, **kwargs)
+            except APIError as e:
+                codigo = e.response.status_code
+                if codigo != 429 and codigo < 500:
+                    raise
+
+                with self._lock:
+                    self.contadores["errores_429" if codigo == 429 else "errores_5xx"] += 1
+                    if intento == SHEETS_REINTENTOS or (codigo != 429 and not idempotente):
+                        self.contadores["fallidas"] += 1
+                        raise
+                    self.contadores["reintentos"] += 1
+                    if codigo == 429:
+                        self._fichas = min(self._fichas, 0.0)
+
+                time.sleep(min(SHEETS_ESPERA_MAX_SEG, 2 ** (intento + 1)) * random.uniform(0.5, 1.0))
+
+@st.cache_resource(show_spinner=False)
+def obtener_limitador_sheets():
+    return LimitadorSheets(SHEETS_LLAMADAS_POR_MIN, SHEETS_RAFAGA)
+
+@st.cache_resource(show_spinner=False)
+def obtener_libro_google_sheets():
+    """
+    Cliente y libro de Google Sheets compartidos por todas las sesiones del proceso:
+    - una sola autenticación (gspread renueva el token cuando expira)
+    - la misma sesión HTTP (keep-alive) para todas las llamadas
+    - todas las llamadas limitadas por el cubo de fichas del proceso
+    """
+    import gspread
+    from oauth2client.service_account import ServiceAccountCredentials
+
+    class ClienteHTTPSheets(gspread.HTTPClient):
+        """Cliente HTTP de gspread: toda petición del libro pasa por el limitador."""
+        limitador = None
+
+        def request(self, method, *args, **kwargs):
+            return self.limitador.ejecutar(
+                super().request, method, *args, idempotente=method.lower() == "get", **kwargs
+            )
+
+    creds_dict = json.loads(st.secrets["GCP_SERVICE_ACCOUNT"])
+    creds = ServiceAccountCredentials.from_json_keyfile_dict(creds_dict, SCOPE_GOOGLE)
+    client = gspread.authorize(creds, http_client=ClienteHTTPSheets)
+    client.http_client.limitador = obtener_limitador_sheets()
+    return client.open_by_key(st.secrets["GOOGLE_SHEETS_ID"])
+
+HOJAS_TTL_SEG = 600  # relistado periódico: recoge hojas "Área - Canal" creadas después del arranque
+
+@st.cache_resource(show_spinner=False, ttl=HOJAS_TTL_SEG)
+def obtener_hojas_google_sheets():
+    """Hojas del libro: {título: worksheet}. Se vuelve a listar cada HOJAS_TTL_SEG o tras una carga fallida."""
+    sh = obtener_libro_google_sheets()
+    return {ws.title.strip(): ws for ws in sh.worksheets()}
+
+def obtener_hoja_google_sheets(nombre_hoja):
+    # El mapa lo comparten el despachador del outbox y las cargas: solo operaciones
+    # atómicas (get / asignación / pop), sin "in" seguido de indexar
+    hojas = obtener_hojas_google_sheets()
+    hoja = hojas.get(nombre_hoja)
+    if hoja is None:
+        # Hoja creada después de abrir el libro
+        hoja = obtener_libro_google_sheets().worksheet(nombre_hoja)
+        hojas[nombre_hoja] = hoja
+    return hoja
 
-    if promedio_otros is not None:
-        return round(promedio_otros, 2)
+# ===============================
+# GOOGLE SHEETS: GUARDAR (OUTBOX LOCAL + ESCRITURA EN SEGUNDO PLANO)
+# ===============================
+RUTA_OUTBOX = os.environ.get(
+    "MONITOREO_OUTBOX",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "outbox_monitoreos.sqlite3")
+)
+OUTBOX_INTERVALO_SEG = 5       # revisión periódica de pendientes
+OUTBOX_ESPERA_MAX_SEG = 300    # tope del backoff entre reintentos
+OUTBOX_RESERVA_SEG = 300       # filas tomadas por un despachador: nadie más las envía en ese lapso
+
+def nombre_hoja_google_sheets(area, canal):
+    if area == "Casa UR":
+        return f"Casa UR - {canal}"
+    elif area == "Conecta UR":
+        return f"Conecta UR - {canal}"
+    return f"{area} - {canal}"
+
+def _conexion_outbox():
+    con = sqlite3.connect(RUTA_OUTBOX, timeout=30)
+    con.execute("PRAGMA journal_mode=WAL")
+    con.execute("""
+        CREATE TABLE IF NOT EXISTS pendientes (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            hoja TEXT NOT NULL,
+            datos TEXT NOT NULL,
+            creado REAL NOT NULL,
+            intentos INTEGER NOT NULL DEFAULT 0,
+            proximo_intento REAL NOT NULL DEFAULT 0,
+            ultimo_error TEXT
+        )
+    """)
+    return con
+
+def guardar_datos_google_sheets(data):
+    """
+    Registra el monitoreo en el outbox local (SQLite) y retorna de inmediato.
+    El despachador en segundo plano lo escribe en la hoja "Área - Canal".
+    """
+    for k, v in data.items():
+        if isinstance(v, date):
+            data[k] = v.strftime("%Y-%m-%d")
+
+    nombre_hoja = nombre_hoja_google_sheets(data["Área"], data["Canal"])
 
-    return 0.0
+    con = _conexion_outbox()
+    try:
+        with metricas.medir("guardar_outbox"), con:
+            cur = con.execute(
+                "INSERT INTO pendientes (hoja, datos, creado) VALUES (?, ?, ?)",
+                (nombre_hoja, json.dumps(data, ensure_ascii=False, default=str), time.time())
+            )
+    finally:
+        con.close()
+
+    obtener_despachador_outbox()["evento"].set()
+    return cur.lastrowid
 
 # ===============================
-# GOOGLE SHEETS: GUARDAR
+# GOOGLE SHEETS: ENCABEZADOS EN CACHÉ (RUTA DE GUARDADO)
 # ===============================
-def guardar_datos_google_sheets(data, intentos=3):
-    for intento in range(intentos):
+ENCABEZADOS_TTL_SEG = 600  # relectura periódica de la fila 1 aunque no haya señales de cambio
+
+@st.cache_resource(show_spinner=False)
+def obtener_cache_encabezados():
+    """{hoja: {"encabezados", "leido"}} compartido por el proceso."""
+    return {"lock": threading.Lock(), "hojas": {}}
+
+def encabezados_hoja(nombre_hoja, hoja):
+    """
+    Fila 1 de la hoja sin leerla en cada guardado. Se vuelve a leer si:
+    - pasó ENCABEZADOS_TTL_SEG
+    - la carga incremental vio encabezados distintos (cambio de esquema)
+    - un append falló (invalidar_hoja_guardado)
+    """
+    cache = obtener_cache_encabezados()
+    marca = obtener_estado_carga_incremental()["hojas"].get(nombre_hoja)
+
+    with cache["lock"]:
+        previo = cache["hojas"].get(nombre_hoja)
+    if (
+        previo is not None
+        and time.time() - previo["leido"] < ENCABEZADOS_TTL_SEG
+        and (marca is None or marca["encabezados"] == previo["encabezados"])
+    ):
+        metricas.contar("cache_encabezados_aciertos")
+        return previo["encabezados"]
+
+    metricas.contar("cache_encabezados_fallos")
+    encabezados = hoja.row_values(1)
+    with cache["lock"]:
+        cache["hojas"][nombre_hoja] = {"encabezados": encabezados, "leido": time.time()}
+    return encabezados
+
+def invalidar_hoja_guardado(nombre_hoja, error):
+    """
+    Tras un append fallido olvida los encabezados; si el error es de rango o
+    de hoja (400/404, hoja renombrada o borrada), también el worksheet en caché.
+    """
+    from gspread.exceptions import APIError, WorksheetNotFound
+
+    cache = obtener_cache_encabezados()
+    with cache["lock"]:
+        cache["hojas"].pop(nombre_hoja, None)
+
+    if isinstance(error, WorksheetNotFound) or (
+        isinstance(error, APIError) and error.response.status_code in (400, 404)
+    ):
+        obtener_hojas_google_sheets().pop(nombre_hoja, None)
+
+def despachar_outbox():
+    """
+    Escribe los pendientes vencidos agrupados por hoja: un append_rows por hoja
+    (worksheet y encabezados salen de caché). Si falla, reprograma con backoff
+    exponencial y jitter.
+    Antes de enviar, reserva las filas (proximo_intento = ahora + OUTBOX_RESERVA_SEG)
+    y envía solo las que reservó: si hay otro despachador (p. ej. tras "Clear cache",
+    que vuelve a crear el hilo) no escribe las mismas filas dos veces.
+    """
+    ahora = time.time()
+    con = _conexion_outbox()
+    try:
+        pendientes = con.execute(
+            "SELECT id, hoja, datos, intentos FROM pendientes "
+            "WHERE proximo_intento <= ? ORDER BY id",
+            (ahora,)
+        ).fetchall()
+
+        por_hoja = {}
+        with con:
+            for id_, nombre_hoja, datos, intentos in pendientes:
+                reservada = con.execute(
+                    "UPDATE pendientes SET proximo_intento = ? WHERE id = ? AND proximo_intento <= ?",
+                    (ahora + OUTBOX_RESERVA_SEG, id_, ahora)
+                ).rowcount
+                if reservada:
+                    por_hoja.setdefault(nombre_hoja, []).append((id_, json.loads(datos), intentos))
+
+        for nombre_hoja, items in por_hoja.items():
+            try:
+                hoja = obtener_hoja_google_sheets(nombre_hoja)
+                encabezados = encabezados_hoja(nombre_hoja, hoja)
+                with metricas.medir("append_outbox"):
+                    hoja.append_rows([fila_para_encabezados(d, encabezados) for _, d, _ in items])
+            except Exception as e:
+                metricas.contar("outbox_fallos")
+                invalidar_hoja_guardado(nombre_hoja, e)
+                with con:
+                    for id_, _, intentos in items:
+                        espera = min(OUTBOX_ESPERA_MAX_SEG, 2 ** (intentos + 1)) * random.uniform(0.5, 1.0)
+                        con.execute(
+                            "UPDATE pendientes SET intentos = ?, proximo_intento = ?, ultimo_error = ? WHERE id = ?",
+                            (intentos + 1, ahora + espera, str(e), id_)
+                        )
+                continue
+
+            metricas.contar("outbox_filas_escritas", len(items))
+            with con:
+                con.executemany("DELETE FROM pendientes WHERE id = ?", [(id_,) for id_, _, _ in items])
+    finally:
+        con.close()
+
+def _bucle_despachador_outbox(evento):
+    while True:
+        evento.wait(OUTBOX_INTERVALO_SEG)
+        evento.clear()
         try:
-            for k, v in data.items():
-                if isinstance(v, date):
-                    data[k] = v.strftime("%Y-%m-%d")
+            despachar_outbox()
+        except Exception:
+            pass  # se reintenta en la siguiente vuelta
+
+@st.cache_resource(show_spinner=False)
+def obtener_despachador_outbox():
+    """Hilo único por proceso que vacía el outbox (también lo pendiente de ejecuciones anteriores)."""
+    evento = threading.Event()
+    hilo = threading.Thread(target=_bucle_despachador_outbox, args=(evento,), daemon=True)
+    hilo.start()
+    return {"evento": evento, "hilo": hilo}
+
+def estado_envios(ids):
+    """
+    Estado de cada monitoreo encolado (id devuelto por guardar_datos_google_sheets):
+    - guardado: ya no está en el outbox (el despachador lo escribió y lo borró)
+    - pendiente: esperando turno / con_error: falló y se reintentará
+    """
+    con = _conexion_outbox()
+    try:
+        filas = con.execute(
+            f"SELECT id, intentos, ultimo_error FROM pendientes WHERE id IN ({','.join('?' * len(ids))})",
+            list(ids)
+        ).fetchall() if ids else []
+    finally:
+        con.close()
+
+    en_cola = {id_: (intentos, error) for id_, intentos, error in filas}
+    estados = {}
+    for id_ in ids:
+        if id_ not in en_cola:
+            estados[id_] = {"estado": "guardado", "error": None}
+        elif en_cola[id_][0] > 0:
+            estados[id_] = {"estado": "con_error", "error": en_cola[id_][1]}
+        else:
+            estados[id_] = {"estado": "pendiente", "error": None}
+    return estados
 
-            creds_json = st.secrets["GCP_SERVICE_ACCOUNT"]
-            creds_dict = json.loads(creds_json)
+def reintentar_envio(id_):
+    """Adelanta el próximo intento de un envío con error y despierta al despachador."""
+    con = _conexion_outbox()
+    try:
+        with con:
+            con.execute("UPDATE pendientes SET proximo_intento = 0 WHERE id = ?", (id_,))
+    finally:
+        con.close()
+    obtener_despachador_outbox()["evento"].set()
+
+def resumen_outbox():
+    con = _conexion_outbox()
+    try:
+        pendientes, con_error = con.execute(
+            "SELECT COUNT(*), COALESCE(SUM(intentos > 0), 0) FROM pendientes"
+        ).fetchone()
+        ultimo_error = con.execute(
+            "SELECT ultimo_error FROM pendientes WHERE ultimo_error IS NOT NULL ORDER BY id DESC LIMIT 1"
+        ).fetchone()
+    finally:
+        con.close()
+    return {
+        "pendientes": pendientes,
+        "con_error": con_error,
+        "ultimo_error": ultimo_error[0] if ultimo_error else None
+    }
 
-            scope = [
-                "https://spreadsheets.google.com/feeds",
-                "https://www.googleapis.com/auth/drive"
-            ]
+# ===============================
+# GOOGLE SHEETS: CARGA INCREMENTAL
+# ===============================
+RECARGA_COMPLETA_SEG = 24 * 3600  # relectura total diaria (recoge ediciones de filas antiguas)
 
-            creds = ServiceAccountCredentials.from_json_keyfile_dict(creds_dict, scope)
-            client = gspread.authorize(creds)
-            sh = client.open_by_key(st.secrets["GOOGLE_SHEETS_ID"])
+@st.cache_resource(show_spinner=False)
+def obtener_estado_carga_incremental():
+    """
+    Marcas de agua por hoja, compartidas por el proceso:
+    {título: {"encabezados", "filas", "ancla", "df", "recarga"}}
+    - filas: filas de datos ya descargadas
+    - ancla: última fila conocida (para detectar si la hoja se encogió o cambió)
+    """
+    return {"lock": threading.Lock(), "hojas": {}}
+
+def _ajustar_fila(fila, ancho):
+    fila = list(fila[:ancho])
+    return fila + [""] * (ancho - len(fila))
+
+def _limpiar_encabezados(fila):
+    encabezados = list(fila)
+    while encabezados and encabezados[-1] == "":
+        encabezados.pop()
+    return encabezados
+
+def _construir_df_hoja(encabezados, filas, area_name, canal_name):
+    # Mismos valores que ws.get_all_records(), sin un dict por fila.
+    # Las columnas de pregunta quedan con su ID (encabezado corto o texto heredado).
+    from gspread.utils import numericise_all
+
+    df_temp = pd.DataFrame(
+        [numericise_all(f) for f in filas],
+        columns=normalizar_encabezados(area_name, canal_name, encabezados)
+    )
+
+    # ================= PROCESAR PREGUNTAS =================
+    rubrica = obtener_rubrica(area_name, canal_name)
+
+    for q in (rubrica.preguntas if rubrica else ()):
+        if q.id in df_temp.columns:
+            df_temp[q.id] = (
+                pd.to_numeric(df_temp[q.id], errors="coerce")
+                .fillna(0)
+            )
+
+    # ================= METADATA =================
+    df_temp["Área"] = area_name
+    df_temp["Canal"] = canal_name
+
+    return df_temp
+
+def _rangos_hoja(ws, previo):
+    """
+    Rangos A1 a pedir para una hoja:
+    - con marca de agua vigente: encabezado + cola desde la última fila conocida (ancla)
+    - sin marca (primera lectura o relectura diaria) o sin encabezado: la hoja completa
+    """
+    from gspread.utils import absolute_range_name, rowcol_to_a1
+
+    if (
+        previo is not None
+        and previo["encabezados"]
+        and time.time() - previo["recarga"] < RECARGA_COMPLETA_SEG
+    ):
+        col_final = rowcol_to_a1(1, len(previo["encabezados"])).rstrip("0123456789")
+        return [
+            absolute_range_name(ws.title, "1:1"),
+            absolute_range_name(ws.title, f"A{previo['filas'] + 1}:{col_final}")
+        ]
+    return [absolute_range_name(ws.title)]
+
+def _aplicar_valores_hoja(title, area_name, canal_name, marcas, bloques):
+    """
+    Actualiza la marca de agua de la hoja con los valores recibidos para _rangos_hoja.
+    Devuelve el DataFrame de la hoja, o None si la cola no encaja con el ancla
+    (encabezado cambiado, hoja encogida o editada) y hace falta recarga completa.
+    """
+    if len(bloques) == 1:
+        # ================= RECARGA COMPLETA =================
+        valores = bloques[0]
+        encabezados = _limpiar_encabezados(valores[0]) if valores else []
+        ancho = len(encabezados)
+        filas = [_ajustar_fila(f, ancho) for f in valores[1:]]
+
+        marcas[title] = {
+            "encabezados": encabezados,
+            "filas": len(filas),
+            "ancla": filas[-1] if filas else _ajustar_fila(encabezados, ancho),
+            "df": _construir_df_hoja(encabezados, filas, area_name, canal_name),
+            "recarga": time.time()
+        }
+        return marcas[title]["df"]
+
+    # ================= CARGA INCREMENTAL =================
+    encabezado, cola = bloques
+    previo = marcas[title]
+    ancho = len(previo["encabezados"])
+    encabezados = _limpiar_encabezados(encabezado[0]) if encabezado else []
+
+    if (
+        encabezados != previo["encabezados"]
+        or not cola
+        or _ajustar_fila(cola[0], ancho) != previo["ancla"]
+    ):
+        return None
+
+    nuevas = [_ajustar_fila(f, ancho) for f in cola[1:]]
+    if nuevas:
+        df_nuevo = _construir_df_hoja(encabezados, nuevas, area_name, canal_name)
+        previo["df"] = (
+            df_nuevo if previo["df"].empty
+            else pd.concat([previo["df"], df_nuevo], ignore_index=True)
+        )
+        previo["filas"] += len(nuevas)
+        previo["ancla"] = nuevas[-1]
+    return previo["df"]
+
+# ===============================
+# GOOGLE SHEETS: LECTURA EN LOTE
+# ===============================
+CARGA_EN_LOTE = True  # True: todas las hojas en un solo values_batch_get; False: una petición por hoja
+
+def _descargar_rangos(sh, rangos_por_hoja):
+    """Devuelve, por hoja, la lista de matrices de valores de sus rangos (mismo orden)."""
+    lotes = (
+        [rangos_por_hoja] if CARGA_EN_LOTE
+        else [[rangos] for rangos in rangos_por_hoja]
+    )
 
-            area = data["Área"]
-            canal = data["Canal"]
+    valores = []
+    for lote in lotes:
+        rangos = [r for rangos in lote for r in rangos]
+        respuesta = sh.values_batch_get(rangos)
+        valores.extend(vr.get("values", []) for vr in respuesta.get("valueRanges", []))
 
-            if area == "Casa UR":
-                nombre_hoja = f"Casa UR - {canal}"
-            elif area == "Conecta UR":
-                nombre_hoja = f"Conecta UR - {canal}"
-            else:
-                nombre_hoja = f"{area} - {canal}"
+    bloques = []
+    for rangos in rangos_por_hoja:
+        bloques.append(valores[:len(rangos)])
+        valores = valores[len(rangos):]
+    return bloques
 
-            hoja = sh.worksheet(nombre_hoja)
+def _leer_hojas(sh, hojas_validas, marcas):
+    """
+    hojas_validas: [(title, ws, area_name, canal_name)]
+    Primera vuelta: colas incrementales + hojas nuevas en un solo lote.
+    Segunda vuelta (solo si hace falta): recarga completa de las hojas cuyo ancla no coincidió.
+    """
+    dfs = []
+    pendientes = hojas_validas
 
-            encabezados = hoja.row_values(1)
+    for _ in range(2):
+        rangos_por_hoja = [_rangos_hoja(ws, marcas.get(title)) for title, ws, _, _ in pendientes]
+        bloques_por_hoja = _descargar_rangos(sh, rangos_por_hoja)
 
-            fila = [data.get(col, "") for col in encabezados]
-            hoja.append_row(fila)
+        recargar = []
+        for hoja, bloques in zip(pendientes, bloques_por_hoja):
+            title, _, area_name, canal_name = hoja
+            df_temp = _aplicar_valores_hoja(title, area_name, canal_name, marcas, bloques)
+            if df_temp is None:
+                marcas.pop(title, None)
+                recargar.append(hoja)
+            elif not df_temp.empty:
+                dfs.append(df_temp)
 
-            return  # éxito
+        if not recargar:
+            break
+        pendientes = recargar
 
-        except Exception as e:
-            if intento < intentos - 1:
-                time.sleep(2)  # espera 2 segundos y reintenta
-            else:
-                st.error(f"❌ Error al guardar después de varios intentos: {e}")
+    return dfs
 
 # ===============================
 # GOOGLE SHEETS: CARGAR TODAS LAS HOJAS
 # ===============================
-@st.cache_data(ttl=600)  # ⏱️ Cache por 10 minutos (ajustable)
-def cargar_todas_las_hojas_google_sheets():
+@metricas.medir("carga_sheets")
+def _cargar_desde_google_sheets():
     try:
-        # ================= CREDENCIALES =================
-        creds_json = st.secrets["GCP_SERVICE_ACCOUNT"]
-        creds_dict = json.loads(creds_json)
+        return _cargar_hojas_validas(obtener_hojas_google_sheets())
+    except Exception:
+        # Hoja renombrada o borrada (rango inexistente → 400): se vuelve a listar el libro una vez
+        obtener_hojas_google_sheets.clear()
+        return _cargar_hojas_validas(obtener_hojas_google_sheets())
+
+def _cargar_hojas_validas(hojas):
+    estado = obtener_estado_carga_incremental()
+
+    # ================= HOJAS VÁLIDAS =================
+    hojas_validas = []
+
+    # Copia: el despachador del outbox puede agregar o quitar hojas mientras tanto
+    for title, ws in list(hojas.items()):
+        # Validar formato "Área - Canal"
+        if " - " not in title:
+            continue
 
-        scope = [
-            "https://spreadsheets.google.com/feeds",
-            "https://www.googleapis.com/auth/drive"
-        ]
+        area_name, canal_name = [x.strip() for x in title.split(" - ", 1)]
 
-        creds = ServiceAccountCredentials.from_json_keyfile_dict(creds_dict, scope)
-        client = gspread.authorize(creds)
+        # Validar área y canal permitidos
+        if area_name not in areas:
+            continue
 
-        sh = client.open_by_key(st.secrets["GOOGLE_SHEETS_ID"])
+        if canal_name not in areas[area_name]["canales"]:
+            continue
 
-        # ================= LECTURA DE HOJAS =================
-        dfs = []
+        hojas_validas.append((title, ws, area_name, canal_name))
 
-        for ws in sh.worksheets():
-            title = ws.title.strip()
+    # ================= LECTURA DE HOJAS =================
+    titulos = [title for title, _, _, _ in hojas_validas]
 
-            # Validar formato "Área - Canal"
-            if " - " not in title:
-                continue
+    with estado["lock"]:
+        dfs = (
+            _leer_hojas(obtener_libro_google_sheets(), hojas_validas, estado["hojas"])
+            if hojas_validas else []
+        )
+        # Marcas de hojas borradas o renombradas: ya no cuentan para la versión
+        for title in set(estado["hojas"]) - set(titulos):
+            estado["hojas"].pop(title)
+        version = version_desde_marcas(estado["hojas"], titulos)
 
-            area_name, canal_name = [x.strip() for x in title.split(" - ", 1)]
+    df = pd.concat(dfs, ignore_index=True) if dfs else pd.DataFrame()
+    df.attrs["version_datos"] = version
+    return df
 
-            # Validar área y canal permitidos
-            if area_name not in areas:
-                continue
+@metricas.medir("version_datos")
+def version_desde_marcas(marcas, titulos):
+    """
+    Versión de los datos a partir de las marcas de agua, sin recorrer el DataFrame:
+    por hoja, encabezados, filas, ancla y hora de la última recarga completa
+    (que es la que recoge ediciones de filas antiguas).
+    """
+    h = hashlib.sha1()
+    for title in sorted(titulos):
+        m = marcas[title]
+        h.update(json.dumps(
+            [title, m["encabezados"], m["filas"], m["ancla"], m["recarga"]],
+            ensure_ascii=False, default=str
+        ).encode("utf-8"))
+    return h.hexdigest()[:16]
 
-            if canal_name not in areas[area_name]["canales"]:
-                continue
+# ===============================
+# SNAPSHOT LOCAL (ARRANQUE EN CALIENTE)
+# ===============================
+ESQUEMA_SNAPSHOT = "2"  # 2: columnas de pregunta con ID corto
 
-            records = ws.get_all_records()
-            if not records:
-                continue
+RUTA_SNAPSHOT = os.environ.get(
+    "MONITOREO_SNAPSHOT",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "snapshot_monitoreos.feather")
+)
+
+@st.cache_resource(show_spinner=False)
+def obtener_estado_snapshot():
+    """
+    - sincronizado: ya hubo una carga real desde Sheets en este proceso
+    - refrescando: hay un refresco en segundo plano en curso
+    - version_guardada: versión escrita por última vez en el snapshot
+    """
+    return {"lock": threading.Lock(), "sincronizado": False, "refrescando": False, "version_guardada": None}
 
-            df_temp = pd.DataFrame(records)
-            df_temp.columns = [str(c).strip() for c in df_temp.columns]
+def calcular_version_datos(df):
+    """Huella del contenido: cambia si cambia cualquier celda, columna o fila."""
+    h = hashlib.sha1("|".join(map(str, df.columns)).encode("utf-8"))
+    if not df.empty:
+        h.update(pd.util.hash_pandas_object(df.astype(str), index=False).values.tobytes())
+    return h.hexdigest()[:16]
 
-            # ================= PROCESAR PREGUNTAS =================
-            preguntas_def = obtener_preguntas(area_name, canal_name)
+def _columnas_para_arrow(df):
+    """
+    Arrow no admite columnas object con tipos mezclados (ej. "Código" con números y texto):
+    - si todo lo no vacío es numérico → numérico (vacíos como NaN)
+    - en otro caso → texto
+    """
+    df = df.copy()
+    for col in df.columns[df.dtypes == object]:
+        valores = df[col].dropna()
+        if valores.map(type).nunique() <= 1:
+            continue
+        numerico = pd.to_numeric(df[col].replace("", None), errors="coerce")
+        if numerico.notna().sum() == (valores != "").sum():
+            df[col] = numerico
+        else:
+            df[col] = df[col].where(df[col].isna(), df[col].astype(str))
+    return df
+
+def guardar_snapshot(df, version):
+    import pyarrow as pa
+    import pyarrow.feather as feather
+
+    tabla = pa.Table.from_pandas(_columnas_para_arrow(df), preserve_index=False)
+    tabla = tabla.replace_schema_metadata({
+        **(tabla.schema.metadata or {}),
+        b"version_datos": version.encode("utf-8"),
+        b"esquema": ESQUEMA_SNAPSHOT.encode("utf-8"),
+        b"guardado": str(time.time()).encode("utf-8")
+    })
+    temporal = f"{RUTA_SNAPSHOT}.tmp"
+    # Sin compresión para poder leerlo con memory-map
+    feather.write_feather(tabla, temporal, compression="uncompressed")
+    os.replace(temporal, RUTA_SNAPSHOT)
+
+@metricas.medir("leer_snapshot")
+def leer_snapshot():
+    if not os.path.exists(RUTA_SNAPSHOT):
+        return None
+    try:
+        import pyarrow.feather as feather
 
-            for p in preguntas_def:
-                if p in df_temp.columns:
-                    df_temp[p] = (
-                        pd.to_numeric(df_temp[p], errors="coerce")
-                        .fillna(0)
-                    )
+        tabla = feather.read_table(RUTA_SNAPSHOT, memory_map=True)
+        if tabla.schema.metadata.get(b"esquema", b"1").decode("utf-8") != ESQUEMA_SNAPSHOT:
+            return None
+        df = tabla.to_pandas()
+        df.attrs["version_datos"] = tabla.schema.metadata[b"version_datos"].decode("utf-8")
+        return df
+    except Exception:
+        return None
 
-            # ================= METADATA =================
-            df_temp["Área"] = area_name
-            df_temp["Canal"] = canal_name
+def _sincronizar_con_google_sheets():
+    """Carga desde Sheets (la versión sale de las marcas de agua) y reescribe el snapshot solo si cambió."""
+    df = _cargar_desde_google_sheets()
+    version = df.attrs["version_datos"]
 
-            dfs.append(df_temp)
+    estado = obtener_estado_snapshot()
+    with estado["lock"]:
+        estado["sincronizado"] = True
+        if version != estado["version_guardada"]:
+            try:
+                guardar_snapshot(df, version)
+                estado["version_guardada"] = version
+            except Exception:
+                pass  # el snapshot es solo una optimización del arranque
+    return df
+
+def _refrescar_en_segundo_plano():
+    estado = obtener_estado_snapshot()
+    try:
+        _sincronizar_con_google_sheets()
+        # La siguiente ejecución de cualquier página toma los datos frescos
+        cargar_todas_las_hojas_google_sheets.clear()
+    except Exception:
+        pass  # se reintenta en la siguiente carga
+    finally:
+        estado["refrescando"] = False
 
-        if not dfs:
-            return pd.DataFrame()
+@st.cache_data(ttl=600)  # ⏱️ Cache por 10 minutos (ajustable)
+def cargar_todas_las_hojas_google_sheets():
+    """
+    Primera carga del proceso: si hay snapshot local se devuelve de inmediato
+    y Sheets se consulta en segundo plano. Luego, carga incremental normal.
+    El DataFrame lleva su versión en df.attrs["version_datos"].
+    """
+    metricas.contar("cache_datos_fallos")
+    estado = obtener_estado_snapshot()
+
+    if not estado["sincronizado"]:
+        df_snapshot = leer_snapshot()
+        if df_snapshot is not None:
+            with estado["lock"]:
+                if not estado["refrescando"]:
+                    estado["refrescando"] = True
+                    threading.Thread(target=_refrescar_en_segundo_plano, daemon=True).start()
+            return df_snapshot
 
-        return pd.concat(dfs, ignore_index=True)
+    try:
+        return _sincronizar_con_google_sheets()
 
     except Exception as e:
+        df_snapshot = leer_snapshot()
+        if df_snapshot is not None:
+            st.warning(f"⚠️ No se pudo actualizar desde Google Sheets, se muestran los últimos datos guardados: {e}")
+            return df_snapshot
         st.error(f"⚠️ Error cargando datos: {e}")
         return pd.DataFrame()
+
+# ===============================
+# DATASET ANALÍTICO (NORMALIZADO UNA VEZ POR VERSIÓN)
+# ===============================
+@st.cache_resource(show_spinner=False, max_entries=2)
+@metricas.medir("normalizacion")
+def _preparar_dataset_analitico(_df_crudo, version_datos):
+    """
+    Limpieza común a todas las páginas, una sola vez por versión de datos:
+    - descarta filas vacías o sin Área / Canal / Asesor
+    - Total numérico, Fecha como datetime, columnas Mes y Año
+    El resultado se comparte entre sesiones: las páginas filtran, no lo modifican.
+    """
+    metricas.contar("cache_dataset_fallos")
+    df = _df_crudo.dropna(how="all").copy()
+    df.columns = [str(c).strip() for c in df.columns]
+    df = df.dropna(subset=["Área", "Canal", "Asesor"])
+
+    df["Total"] = pd.to_numeric(df["Total"], errors="coerce").fillna(0)
+    df["Fecha"] = pd.to_datetime(df["Fecha"], errors="coerce")
+    df["Mes"] = df["Fecha"].dt.month
+    df["Año"] = df["Fecha"].dt.year
+
+    return df.reset_index(drop=True)
+
+def obtener_dataset_analitico():
+    metricas.contar("cache_datos_solicitudes")
+    with metricas.medir("cargar_datos"):
+        df = cargar_todas_las_hojas_google_sheets()
+    if df.empty:
+        return df
+    version = df.attrs.get("version_datos") or calcular_version_datos(df)
+    metricas.contar("cache_dataset_solicitudes")
+    return _preparar_dataset_analitico(df, version)
+
+# ===============================
+# CUBO AGREGADO PARA DASHBOARDS
+# ===============================
+DIMENSIONES_CUBO = ["Área", "Canal", "Año", "Mes", "Asesor", "Monitor"]
+
+@st.cache_resource(show_spinner=False, max_entries=2)
+@metricas.medir("cubo")
+def _construir_cubo_agregado(_df, version_datos):
+    """
+    Agregados por (Área, Canal, Año, Mes, Asesor, Monitor), una vez por versión de datos:
+    - Monitoreos, Suma Total, Errores críticos
+    - por cada pregunta del formulario (columna = ID): cantidad de monitoreos que cumplen (puntaje > 0)
+    Además guarda aparte las filas con error crítico (para su tabla de detalle).
+    """
+    metricas.contar("cache_cubo_fallos")
+    preguntas = [
+        q.id for rubrica in RUBRICAS.values() for q in rubrica.preguntas if q.id in _df.columns
+    ]
+
+    es_critico = _df["Error crítico"] == "Sí"
+
+    base = _df[DIMENSIONES_CUBO].assign(
+        **{
+            "Monitoreos": 1,
+            "Suma Total": _df["Total"],
+            "Errores críticos": es_critico.astype(int)
+        }
+    )
+    cumple = (_df[preguntas].apply(pd.to_numeric, errors="coerce").fillna(0) > 0).astype(int)
+
+    cubo = (
+        pd.concat([base, cumple], axis=1)
+        .groupby(DIMENSIONES_CUBO, dropna=False, sort=False)
+        .sum()
+        .reset_index()
+    )
+
+    return {"cubo": cubo, "errores_criticos": _df[es_critico]}
+
+def obtener_cubo_agregado(df):
+    version = df.attrs.get("version_datos") or calcular_version_datos(df)
+    metricas.contar("cache_cubo_solicitudes")
+    return {**_construir_cubo_agregado(df, version), "version": version}
+
+def filtrar_por(df, filtros):
+    """filtros: {columna: valor}. Sirve para el cubo y para las filas de detalle."""
+    mascara = pd.Series(True, index=df.index)
+    for col, valor in filtros.items():
+        mascara &= df[col] == valor
+    return df[mascara]
+
+def resumir_cubo(cubo_f):
+    monitoreos = int(cubo_f["Monitoreos"].sum())
+    asesores = cubo_f["Asesor"].nunique()
+    return {
+        "monitoreos": monitoreos,
+        "promedio_total": cubo_f["Suma Total"].sum() / monitoreos if monitoreos else 0.0,
+        "errores_criticos": int(cubo_f["Errores críticos"].sum()),
+        "promedio_por_asesor": monitoreos / asesores if asesores > 0 else 0
+    }
+
+def monitoreos_por(cubo_f, dimension, nombre):
+    return (
+        cubo_f.groupby(dimension)["Monitoreos"].sum()
+        .reset_index(name=nombre)
+        .sort_values(nombre, ascending=False)
+    )
+
+# ===============================
+# CUMPLIMIENTO POR PREGUNTA (VECTORIZADO)
+# ===============================
+METRICAS_CUBO = ["Monitoreos", "Suma Total", "Errores críticos"]
+
+def _orden_preguntas():
+    return pd.DataFrame(
+        [
+            (r.area, r.canal, q.id, q.texto, q.etiqueta, i)
+            for r in RUBRICAS.values()
+            for i, q in enumerate(r.preguntas)
+        ],
+        columns=["Área", "Canal", "id", "Pregunta", "Pregunta_wrapped", "orden"]
+    )
+
+@metricas.medir("cumplimiento")
+def calcular_cumplimiento(cubo_f, por_asesor=False):
+    """
+    Cumplimiento (%) de todas las preguntas para cada (Área, Canal[, Asesor])
+    del cubo filtrado, en un solo groupby + melt.
+    Formato largo listo para los gráficos horizontales: solo las preguntas
+    del formulario de cada canal, con su etiqueta del registro de rúbricas
+    (Pregunta_wrapped) y la primera pregunta arriba.
+    """
+    claves = ["Área", "Canal"] + (["Asesor"] if por_asesor else [])
+    preguntas = [c for c in cubo_f.columns if c not in DIMENSIONES_CUBO and c not in METRICAS_CUBO]
+
+    agregado = cubo_f.groupby(claves, sort=False)[["Monitoreos"] + preguntas].sum()
+    largo = (
+        agregado[preguntas].div(agregado["Monitoreos"], axis=0).mul(100)
+        .reset_index()
+        .melt(id_vars=claves, var_name="id", value_name="Cumplimiento")
+        .merge(_orden_preguntas(), on=["Área", "Canal", "id"], how="inner")
+    )
+
+    return largo.sort_values("orden", ascending=False, kind="stable")
+
+# ===============================
+# FIGURAS EN CACHÉ (PÁGINA, FILTROS, VERSIÓN DE DATOS)
+# ===============================
+FIGURAS_MAX_ENTRADAS = 48   # por constructor; se descartan las menos recientes
+FIGURAS_TTL_SEG = 3600
+
+def clave_filtros(filtros):
+    return tuple(sorted(filtros.items()))
+
+@metricas.contado("cache_figuras_solicitudes")
+@st.cache_resource(show_spinner=False, max_entries=FIGURAS_MAX_ENTRADAS, ttl=FIGURAS_TTL_SEG)
+@metricas.medir("figura_monitoreos")
+def figura_monitoreos_por(_cubo_f, pagina, filtros, version_datos, dimension, nombre, titulo):
+    """
+    Barras de monitoreos por dimensión. El cubo filtrado no se hashea:
+    (pagina, filtros, version_datos) lo identifican.
+    """
+    import plotly.express as px
+
+    metricas.contar("cache_figuras_fallos")
+    fig = px.bar(
+        monitoreos_por(_cubo_f, dimension, nombre),
+        x=dimension, y=nombre, title=titulo, text=nombre, color=nombre
+    )
+    fig.update_layout(xaxis_tickangle=-45)
+    return fig
+
+@metricas.contado("cache_figuras_solicitudes")
+@st.cache_resource(show_spinner=False, max_entries=FIGURAS_MAX_ENTRADAS, ttl=FIGURAS_TTL_SEG)
+@metricas.medir("figuras_cumplimiento")
+def figuras_cumplimiento(_cubo_f, pagina, filtros, version_datos, titulo="Cumplimiento por Criterio"):
+    """{(Área, Canal): gráfico horizontal} de los canales con preguntas registradas."""
+    import plotly.express as px
+
+    metricas.contar("cache_figuras_fallos")
+    figuras = {}
+    for (area_actual, canal_actual), df_preg in calcular_cumplimiento(_cubo_f).groupby(["Área", "Canal"], sort=False):
+        fig = px.bar(
+            df_preg,
+            x="Cumplimiento",
+            y="Pregunta_wrapped",
+            orientation="h",
+            color="Cumplimiento",
+            color_continuous_scale="RdYlGn",
+            title=f"{titulo} – {canal_actual}",
+            range_x=[0, 100]
+        )
+        fig.update_traces(texttemplate="%{x:.1f}%", textposition="outside")
+        figuras[(area_actual, canal_actual)] = ajustar_grafico_horizontal(fig, df_preg, "Pregunta_wrapped")
+    return figuras
+
+# ===============================
+# EXPORTACIÓN EXCEL (BAJO DEMANDA, MEMORIA CONSTANTE)
+# ===============================
+FILAS_POR_BLOQUE_EXCEL = 5000
+
+COLUMNAS_BASE_EXPORTE = [
+    "Área", "Canal", "Monitor", "Asesor", "Código", "Fecha",
+    "Error crítico", "Total", "Aspectos positivos", "Aspectos por Mejorar"
+]
+
+def _valor_excel(v):
+    if pd.isna(v):
+        return None
+    if isinstance(v, pd.Timestamp):
+        return v.strftime("%Y-%m-%d")
+    return v
+
+def _escribir_hoja_excel(libro, nombre, df):
+    hoja = libro.add_worksheet(nombre[:31])
+    hoja.write_row(0, 0, [str(c) for c in df.columns])
+
+    fila_excel = 1
+    for inicio in range(0, len(df), FILAS_POR_BLOQUE_EXCEL):
+        bloque = df.iloc[inicio:inicio + FILAS_POR_BLOQUE_EXCEL]
+        for fila in bloque.itertuples(index=False, name=None):
+            hoja.write_row(fila_excel, 0, [_valor_excel(v) for v in fila])
+            fila_excel += 1
+
+def monitoreos_para_exportar(df, desde, hasta):
+    """Una tabla por (Área, Canal) con los monitoreos del periodo y las preguntas con su texto."""
+    en_rango = df[(df["Fecha"] >= pd.Timestamp(desde)) & (df["Fecha"] <= pd.Timestamp(hasta))]
+
+    for (area, canal), grupo in en_rango.groupby(["Área", "Canal"], sort=True):
+        rubrica = obtener_rubrica(area, canal)
+        preguntas = [q.id for q in rubrica.preguntas if q.id in grupo.columns] if rubrica else []
+        base = [c for c in COLUMNAS_BASE_EXPORTE if c in grupo.columns]
+
+        tabla = grupo[base + preguntas].rename(
+            columns={p: PREGUNTAS_POR_ID[p].texto for p in preguntas}
+        )
+        yield f"{area} - {canal}", tabla
+
+@metricas.medir("exportar_excel")
+def generar_excel_resultados(consolidado, monitoreos=None):
+    """
+    Arma el .xlsx solo cuando el usuario lo pide (st.download_button con callable).
+    xlsxwriter en modo constant_memory: las filas se escriben por bloques y se
+    vuelcan a disco, sin mantener el libro completo en memoria.
+    monitoreos: iterable opcional de (nombre_hoja, DataFrame) con los registros crudos.
+    """
+    import xlsxwriter
+
+    with tempfile.NamedTemporaryFile(suffix=".xlsx", delete=False) as tmp:
+        ruta = tmp.name
+
+    try:
+        libro = xlsxwriter.Workbook(ruta, {"constant_memory": True})
+        _escribir_hoja_excel(libro, "Consolidado", consolidado)
+        for nombre, tabla in (monitoreos or []):
+            _escribir_hoja_excel(libro, nombre, tabla)
+        libro.close()
+
+        with open(ruta, "rb") as f:
+            return f.read()
+    finally:
+        os.remove(ruta)
+
 # ===============================
 # RESET TOTAL DEL FORMULARIO
 # ===============================
@@ -471,20 +1227,47 @@ def resetear_formulario(area_actual: str, canal_actual: str):
     st.session_state["f_asesor"] = "Seleccione una opción"
     st.session_state["f_canal"] = None
     st.session_state["f_codigo"] = ""
-    st.session_state["f_fecha"] = date.today()
+    st.session_state.pop("f_fecha", None)  # el widget vuelve a su valor por defecto (hoy)
     st.session_state["f_error"] = "No"
     st.session_state["f_pos"] = ""
     st.session_state["f_mej"] = ""
 
     # Radios de preguntas (si estaban renderizadas)
+    rubrica = obtener_rubrica(area_actual, canal_actual)
+    if rubrica:
+        for q in rubrica.preguntas:
+            st.session_state.pop(q.clave_widget, None)
+# ===============================
+# PANEL DE RENDIMIENTO (OCULTO)
+# ===============================
+PAGINA_RENDIMIENTO = "🛠️ Rendimiento"
+
+def modo_admin():
+    """
+    El panel de rendimiento no aparece en el menú salvo con ?admin=<ADMIN_CLAVE> en la URL.
+    Sin ADMIN_CLAVE en secrets queda cerrado (su botón reinicia las métricas de todo el proceso).
+    """
+    valor = st.query_params.get("admin")
+    if not valor:
+        return False
     try:
-        preguntas = obtener_preguntas(area_actual, canal_actual)
-        for q in preguntas:
-            k = f"q_{abs(hash((area_actual, canal_actual, q)))%10**10}"
-            if k in st.session_state:
-                del st.session_state[k]
-    except:
-        pass
+        clave = st.secrets.get("ADMIN_CLAVE")
+    except Exception:
+        clave = None  # sin secrets.toml
+    if not clave:
+        return False
+    # En bytes: compare_digest no acepta str con caracteres no ASCII (p. ej. "contraseña")
+    return hmac.compare_digest(valor.encode("utf-8"), str(clave).encode("utf-8"))
+
+def contadores_externos():
+    """Contadores que llevan otros componentes (limitador de Sheets, outbox)."""
+    estado = resumen_outbox()
+    return {
+        **{f"sheets_{k}": v for k, v in obtener_limitador_sheets().contadores.items()},
+        "outbox_pendientes": estado["pendientes"],
+        "outbox_con_error": estado["con_error"]
+    }
+
 # ===============================
 # SIDEBAR Y MENÚ
 # ===============================
@@ -498,8 +1281,70 @@ pagina = st.sidebar.radio(
         "🎯 Dashboard por Asesor",
         "📥 Descarga de resultados",
         "🧠 IA"
-    ]
+    ] + ([PAGINA_RENDIMIENTO] if modo_admin() else [])
 )
+metricas.fijar_pagina(pagina)
+
+# ===============================
+# SINCRONIZACIÓN PENDIENTE
+# ===============================
+obtener_despachador_outbox()
+estado_outbox = resumen_outbox()
+
+if estado_outbox["pendientes"]:
+    st.sidebar.caption(
+        f"⏳ Monitoreos por sincronizar con Google Sheets: {estado_outbox['pendientes']}"
+    )
+    if estado_outbox["con_error"]:
+        st.sidebar.caption(
+            f"⚠️ {estado_outbox['con_error']} con reintentos. Último error: {estado_outbox['ultimo_error']}"
+        )
+
+contadores_sheets = obtener_limitador_sheets().contadores
+if contadores_sheets["frenadas"] or contadores_sheets["reintentos"]:
+    st.sidebar.caption(
+        f"🚦 Google Sheets: {contadores_sheets['frenadas']} llamadas frenadas por cuota, "
+        f"{contadores_sheets['reintentos']} reintentos "
+        f"({contadores_sheets['errores_429']} por 429, {contadores_sheets['errores_5xx']} por 5xx)"
+    )
+
+# ===============================
+# ESTADO DE ENVÍOS DE LA SESIÓN
+# ===============================
+ENVIOS_VISIBLES = 5
+
+def registrar_envio(id_, fila):
+    st.session_state.setdefault("envios", []).append({
+        "id": id_,
+        "asesor": fila["Asesor"],
+        "codigo": fila["Código"],
+        "hora": time.strftime("%H:%M:%S")
+    })
+
+def mostrar_estado_envios():
+    """Últimos monitoreos guardados en esta sesión; se actualiza en cada rerun."""
+    envios = st.session_state.get("envios", [])[-ENVIOS_VISIBLES:]
+    if not envios:
+        return
+
+    estados = estado_envios([e["id"] for e in envios])
+
+    st.markdown("**Envíos recientes**")
+    for e in reversed(envios):
+        estado = estados[e["id"]]
+        detalle = f"{e['hora']} · {e['asesor']} · {e['codigo']}"
+
+        if estado["estado"] == "guardado":
+            st.caption(f"✅ Guardado en Google Sheets — {detalle}")
+        elif estado["estado"] == "pendiente":
+            st.caption(f"⏳ Pendiente de sincronizar — {detalle}")
+        else:
+            c1, c2 = st.columns([4, 1])
+            c1.caption(f"⚠️ Falló, se reintentará — {detalle}. {estado['error']}")
+            c2.button("🔁 Reintentar", key=f"reintentar_{e['id']}", on_click=reintentar_envio, args=(e["id"],))
+
+    if any(estados[e["id"]]["estado"] != "guardado" for e in envios):
+        st.button("🔄 Actualizar estado", key="actualizar_envios")
 
 def consolidar_texto(serie):
     textos = serie.dropna().astype(str)
@@ -561,75 +1406,26 @@ st.markdown(f"""
 </div>
 """, unsafe_allow_html=True)
 
-    # ===============================
-    # FUNCIÓN TRANSCRIPCIÓN GEMINI
-    # ===============================
-def transcribir_audio_gemini(audio_file):
-    try:
-        api_key = st.secrets["GEMINI_API_KEY"]
-
-        audio_file.seek(0)
-        audio_bytes = audio_file.read()
-        audio_base64 = base64.b64encode(audio_bytes).decode("utf-8")
-
-        url = f"https://generativelanguage.googleapis.com/v1/models/gemini-2.5-flash-lite:generateContent?key={api_key}"
-
-        headers = {"Content-Type": "application/json"}
-
-        body = {
-            "contents": [
-                {
-                    "parts": [
-                        {
-                            "inline_data": {
-                                "mime_type": audio_file.type,
-                                "data": audio_base64
-                            }
-                        },
-                        {
-                            "text": "Transcribe este audio completamente en texto claro en español."
-                        }
-                    ]
-                }
-            ]
-        }
-
-        # 🔁 Primer intento
-        response = requests.post(url, headers=headers, json=body, timeout=60)
-
-        # 🔥 Si se excede cuota
-        if response.status_code == 429:
-            try:
-                error_json = response.json()
-                retry_info = error_json.get("error", {}).get("details", [])
-                retry_seconds = 45  # fallback
-
-                for detail in retry_info:
-                    if detail.get("@type") == "type.googleapis.com/google.rpc.RetryInfo":
-                        retry_delay = detail.get("retryDelay", "45s")
-                        retry_seconds = int(retry_delay.replace("s", ""))
-
-                st.warning(f"⚠️ Límite alcanzado. Esperando {retry_seconds} segundos...")
-                time.sleep(retry_seconds)
-
-                # 🔁 Segundo intento
-                response = requests.post(url, headers=headers, json=body, timeout=60)
-
-            except:
-                st.error("Se alcanzó el límite diario gratuito. Intenta nuevamente mañana.")
-                return None
-
-        if response.status_code != 200:
-            st.error(f"Error Gemini: {response.text}")
-            return None
+# ===============================
+# GEMINI: TRANSCRIPCIÓN (transcripcion.py)
+# ===============================
+@st.cache_resource(show_spinner=False)
+def obtener_limitador_gemini():
+    """Un solo limitador por proceso, compartido por todas las sesiones."""
+    from transcripcion import LimitadorGemini, GEMINI_INTERVALO_MIN_SEG
 
-        result = response.json()
+    return LimitadorGemini(GEMINI_INTERVALO_MIN_SEG)
 
-        if "candidates" not in result:
-            st.error("Gemini no devolvió respuesta válida.")
-            return None
+def transcribir_audio_gemini(audio_file):
+    from transcripcion import transcribir_grabacion
 
-        return result["candidates"][0]["content"]["parts"][0]["text"]
+    try:
+        return transcribir_grabacion(
+            audio_file,
+            audio_file.type,
+            st.secrets["GEMINI_API_KEY"],
+            obtener_limitador_gemini()
+        )
 
     except Exception as e:
         st.error(f"Error en transcripción con Gemini: {e}")
@@ -637,6 +1433,10 @@ def transcribir_audio_gemini(audio_file):
 
 if pagina == "📝 Formulario de Monitoreo":
 
+    # Limpieza pedida por el guardado anterior (antes de crear los widgets)
+    if "f_limpiar" in st.session_state:
+        resetear_formulario(*st.session_state.pop("f_limpiar"))
+
     st.markdown('<div class="section-title">🧾 Registro de Monitoreo</div>', unsafe_allow_html=True)
 
     # =====================================================
@@ -694,30 +1494,28 @@ if pagina == "📝 Formulario de Monitoreo":
     # =====================================================
     st.markdown("Criterios de evaluación")
 
-    preguntas = obtener_preguntas(area, canal) if area != "Seleccione una opción" and canal else []
-    pesos = obtener_pesos(area, canal) if area != "Seleccione una opción" and canal else []
+    rubrica = obtener_rubrica(area, canal) if area != "Seleccione una opción" and canal else None
 
     resultados = {}
     total = 0
 
-    if preguntas and pesos and len(preguntas) == len(pesos):
+    if rubrica:
 
         if error_critico == "Sí":
             st.error("❌ Error crítico: el puntaje total será 0")
-            for q in preguntas:
-                resultados[q] = 0
+            for q in rubrica.preguntas:
+                resultados[q.id] = 0
 
         else:
-            for q, p in zip(preguntas, pesos):
-                key_q = f"q_{abs(hash((area, canal, q))) % 10**10}"
+            for q in rubrica.preguntas:
                 resp = st.radio(
-                    q,
+                    q.texto,
                     ["Cumple", "No cumple"],
                     horizontal=True,
-                    key=key_q
+                    key=q.clave_widget
                 )
-                resultados[q] = p if resp == "Cumple" else 0
-                total += resultados[q]
+                resultados[q.id] = q.peso if resp == "Cumple" else 0
+                total += resultados[q.id]
 
     else:
         st.info("Selecciona Área y Canal para cargar los criterios de evaluación.")
@@ -735,6 +1533,7 @@ if pagina == "📝 Formulario de Monitoreo":
         positivos = st.text_area(
             "Aspectos Positivos *",
             height=120,
+            key="f_pos",
             placeholder="Ej. Buen manejo del usuario, claridad en la respuesta..."
         )
 
@@ -742,6 +1541,7 @@ if pagina == "📝 Formulario de Monitoreo":
         mejorar = st.text_area(
             "Aspectos por Mejorar *",
             height=120,
+            key="f_mej",
             placeholder="Ej. Validación de identidad, control de tiempos..."
         )
 
@@ -782,30 +1582,28 @@ if pagina == "📝 Formulario de Monitoreo":
             for q, v in resultados.items():
                 fila[q] = v
 
-            guardar_datos_google_sheets(fila)
-            st.success("✅ Monitoreo guardado correctamente")
-            time.sleep(2)
-    
+            # Queda en el outbox; el despachador lo escribe en segundo plano
+            registrar_envio(guardar_datos_google_sheets(fila), fila)
+            st.session_state["f_limpiar"] = (area, canal)
+            st.rerun()
+
+    mostrar_estado_envios()
+
 # =====================================================================
 # 📊 DASHBOARD Casa UR
 # =====================================================================
 elif pagina == "📊 Dashboard Casa UR":
 
-    df = cargar_todas_las_hojas_google_sheets()
+    df = obtener_dataset_analitico()
 
     if df.empty:
         st.warning("📭 No hay datos para mostrar aún.")
         st.stop()
 
-    df = df.dropna(how="all")
-    df.columns = [str(c).strip() for c in df.columns]
-    df = df.dropna(subset=["Área", "Canal", "Asesor"])
-    df["Fecha"] = pd.to_datetime(df["Fecha"], errors="coerce")
-    df["Mes"] = df["Fecha"].dt.month
-    df["Año"] = df["Fecha"].dt.year
-
-    df = df[df["Área"] == "Casa UR"]
-    if df.empty:
+    agregados = obtener_cubo_agregado(df)
+    cubo = agregados["cubo"]
+    cubo = cubo[cubo["Área"] == "Casa UR"]
+    if cubo.empty:
         st.warning("No hay datos para Casa UR.")
         st.stop()
 
@@ -814,133 +1612,94 @@ elif pagina == "📊 Dashboard Casa UR":
 
     st.sidebar.subheader("Filtros Casa UR")
     canal_f = st.sidebar.selectbox("Canal:", ["Todos"] + areas["Casa UR"]["canales"])
-    anio_f = st.sidebar.selectbox("Año:", ["Todos"] + sorted(df["Año"].dropna().unique().astype(int)))
-    mes_f = st.sidebar.selectbox("Mes:", ["Todos"] + [meses[m] for m in sorted(df["Mes"].dropna().unique())])
+    anio_f = st.sidebar.selectbox("Año:", ["Todos"] + sorted(cubo["Año"].dropna().unique().astype(int)))
+    mes_f = st.sidebar.selectbox("Mes:", ["Todos"] + [meses[m] for m in sorted(cubo["Mes"].dropna().unique())])
 
-    df_filtrado = df.copy()
+    filtros = {"Área": "Casa UR"}
     if canal_f != "Todos":
-        df_filtrado = df_filtrado[df_filtrado["Canal"] == canal_f]
+        filtros["Canal"] = canal_f
     if anio_f != "Todos":
-        df_filtrado = df_filtrado[df_filtrado["Año"] == int(anio_f)]
+        filtros["Año"] = int(anio_f)
     if mes_f != "Todos":
-        mes_num = [k for k, v in meses.items() if v == mes_f][0]
-        df_filtrado = df_filtrado[df_filtrado["Mes"] == mes_num]
+        filtros["Mes"] = [k for k, v in meses.items() if v == mes_f][0]
+
+    cubo_f = filtrar_por(cubo, filtros)
 
-    if df_filtrado.empty:
+    if cubo_f.empty:
         st.warning("No hay datos con los filtros seleccionados.")
         st.stop()
 
     # 🔥 ERRORES CRÍTICOS AL INICIO
     mostrar_tabla_errores_criticos(
-        df_filtrado,
+        filtrar_por(agregados["errores_criticos"], filtros),
         titulo="Errores críticos – Casa UR"
     )
 
     st.subheader("📊 Dashboard Casa UR")
 
-    total_monitoreos = len(df_filtrado)
-    total_asesores = df_filtrado["Asesor"].nunique()
-
-    promedio_monitoreos_asesor = (
-    total_monitoreos / total_asesores if total_asesores > 0 else 0
-    )
+    kpis = resumir_cubo(cubo_f)
 
     c1, c2, c3, c4 = st.columns(4)
 
-    c1.metric("Monitoreos Totales", total_monitoreos)
+    c1.metric("Monitoreos Totales", kpis["monitoreos"])
 
     c2.metric(
     "Promedio General (Total puntos)",
-    f"{df_filtrado['Total'].mean():.2f}" if "Total" in df_filtrado.columns else "0.00"
+    f"{kpis['promedio_total']:.2f}"
     )
 
     c3.metric(
     "Errores Críticos",
-    len(df_filtrado[df_filtrado["Error crítico"] == "Sí"])
+    kpis["errores_criticos"]
     )
 
     c4.metric(
     "Promedio Monitoreos por Asesor",
-    f"{promedio_monitoreos_asesor:.2f}"
+    f"{kpis['promedio_por_asesor']:.2f}"
     )
 
     st.subheader("📊 Distribución de Monitoreos – Casa UR")
 
-    monit_por_asesor = df_filtrado.groupby("Asesor").size().reset_index(name="Monitoreos").sort_values("Monitoreos", ascending=False)
-    fig_asesores = px.bar(monit_por_asesor, x="Asesor", y="Monitoreos", title="Cantidad de Monitoreos por Asesor", text="Monitoreos", color="Monitoreos")
-    fig_asesores.update_layout(xaxis_tickangle=-45)
+    clave_figuras = (pagina, clave_filtros(filtros), agregados["version"])
+
+    fig_asesores = figura_monitoreos_por(cubo_f, *clave_figuras, "Asesor", "Monitoreos", "Cantidad de Monitoreos por Asesor")
     st.plotly_chart(fig_asesores, use_container_width=True)
 
-    monit_por_monitor = df_filtrado.groupby("Monitor").size().reset_index(name="Monitoreos realizados").sort_values("Monitoreos realizados", ascending=False)
-    fig_monitor = px.bar(monit_por_monitor, x="Monitor", y="Monitoreos realizados", title="Cantidad de Monitoreos Realizados por Monitor", text="Monitoreos realizados", color="Monitoreos realizados")
-    fig_monitor.update_layout(xaxis_tickangle=-45)
+    fig_monitor = figura_monitoreos_por(cubo_f, *clave_figuras, "Monitor", "Monitoreos realizados", "Cantidad de Monitoreos Realizados por Monitor")
     st.plotly_chart(fig_monitor, use_container_width=True)
 
     st.subheader("🔥 Cumplimiento por Pregunta – Casa UR")
 
-    for canal_actual in df_filtrado["Canal"].unique():
+    figuras = figuras_cumplimiento(cubo_f, *clave_figuras)
+
+    for canal_actual in cubo_f["Canal"].unique():
         st.markdown(f"### 📌 Canal: **{canal_actual}**")
-        df_c = df_filtrado[df_filtrado["Canal"] == canal_actual]
 
-        orden_formulario = obtener_preguntas("Casa UR", canal_actual)
-        if not orden_formulario:
+        if not obtener_preguntas("Casa UR", canal_actual):
             st.info("No hay preguntas configuradas para este canal.")
             continue
 
-        cumplimiento_canal = []
-        for p in orden_formulario:
-            if p not in df_c.columns:
-                continue
-            valores = pd.to_numeric(df_c[p], errors="coerce").fillna(0)
-            pct = (valores > 0).mean() * 100
-            cumplimiento_canal.append({"Pregunta": p, "Cumplimiento": pct})
-
-        if not cumplimiento_canal:
+        if ("Casa UR", canal_actual) not in figuras:
             st.info("Aún no hay columnas de preguntas registradas para este canal.")
             continue
 
-        df_preg_canal = pd.DataFrame(cumplimiento_canal)
-        mapa_orden = {preg: idx for idx, preg in enumerate(orden_formulario)}
-        df_preg_canal["orden"] = df_preg_canal["Pregunta"].map(mapa_orden)
-        df_preg_canal = df_preg_canal.sort_values("orden", ascending=False)
-
-        df_preg_canal["Pregunta_wrapped"] = df_preg_canal["Pregunta"].apply(lambda x: envolver_pregunta(x, 45))
-
-        fig_h = px.bar(
-            df_preg_canal,
-            x="Cumplimiento",
-            y="Pregunta_wrapped",
-            orientation="h",
-            color="Cumplimiento",
-            color_continuous_scale="RdYlGn",
-            title=f"Cumplimiento por Criterio – {canal_actual}",
-            range_x=[0, 100]
-        )
-        fig_h.update_traces(texttemplate="%{x:.1f}%", textposition="outside")
-        fig_h = ajustar_grafico_horizontal(fig_h, df_preg_canal, "Pregunta_wrapped")
-        st.plotly_chart(fig_h, use_container_width=True)
+        st.plotly_chart(figuras[("Casa UR", canal_actual)], use_container_width=True)
 
 # =====================================================================
 # 📈 DASHBOARD CONECTA UR
 # =====================================================================
 elif pagina == "📈 Dashboard Conecta UR":
 
-    df = cargar_todas_las_hojas_google_sheets()
+    df = obtener_dataset_analitico()
 
     if df.empty:
         st.warning("📭 No hay datos para mostrar aún.")
         st.stop()
 
-    df = df.dropna(how="all")
-    df.columns = [str(c).strip() for c in df.columns]
-    df = df.dropna(subset=["Área", "Canal", "Asesor"])
-
-    df["Fecha"] = pd.to_datetime(df["Fecha"], errors="coerce")
-    df["Mes"] = df["Fecha"].dt.month
-    df["Año"] = df["Fecha"].dt.year
-
-    df = df[df["Área"] == "Conecta UR"]
-    if df.empty:
+    agregados = obtener_cubo_agregado(df)
+    cubo = agregados["cubo"]
+    cubo = cubo[cubo["Área"] == "Conecta UR"]
+    if cubo.empty:
         st.warning("No hay datos para Conecta UR.")
         st.stop()
 
@@ -954,37 +1713,38 @@ elif pagina == "📈 Dashboard Conecta UR":
     st.sidebar.subheader("Filtros Conecta UR")
 
     canal_f = st.sidebar.selectbox(
-        "Canal:", ["Todos"] + sorted(df["Canal"].unique())
+        "Canal:", ["Todos"] + sorted(cubo["Canal"].unique())
     )
 
     anio_f = st.sidebar.selectbox(
-        "Año:", ["Todos"] + sorted(df["Año"].dropna().unique().astype(int))
+        "Año:", ["Todos"] + sorted(cubo["Año"].dropna().unique().astype(int))
     )
 
     mes_f = st.sidebar.selectbox(
-        "Mes:", ["Todos"] + [meses[m] for m in sorted(df["Mes"].dropna().unique())]
+        "Mes:", ["Todos"] + [meses[m] for m in sorted(cubo["Mes"].dropna().unique())]
     )
 
     # ================= APLICAR FILTROS =================
-    df_filtrado = df.copy()
+    filtros = {"Área": "Conecta UR"}
 
     if canal_f != "Todos":
-        df_filtrado = df_filtrado[df_filtrado["Canal"] == canal_f]
+        filtros["Canal"] = canal_f
 
     if anio_f != "Todos":
-        df_filtrado = df_filtrado[df_filtrado["Año"] == int(anio_f)]
+        filtros["Año"] = int(anio_f)
 
     if mes_f != "Todos":
-        mes_num = [k for k, v in meses.items() if v == mes_f][0]
-        df_filtrado = df_filtrado[df_filtrado["Mes"] == mes_num]
+        filtros["Mes"] = [k for k, v in meses.items() if v == mes_f][0]
+
+    cubo_f = filtrar_por(cubo, filtros)
 
-    if df_filtrado.empty:
+    if cubo_f.empty:
         st.warning("No hay datos con los filtros seleccionados.")
         st.stop()
 
     # 🔥 TABLA DE ERRORES CRÍTICOS (AL INICIO)
     mostrar_tabla_errores_criticos(
-    df_filtrado,
+    filtrar_por(agregados["errores_criticos"], filtros),
     titulo="Errores críticos – Conecta UR"
 )
 
@@ -992,107 +1752,65 @@ elif pagina == "📈 Dashboard Conecta UR":
     # ================= DASHBOARD =================
     st.subheader("📈 Dashboard Conecta UR – Global")
 
-    total_monitoreos = len(df_filtrado)
-    total_asesores = df_filtrado["Asesor"].nunique()
-
-    promedio_monitoreos_asesor = (
-    total_monitoreos / total_asesores if total_asesores > 0 else 0
-    )
+    kpis = resumir_cubo(cubo_f)
 
     c1, c2, c3, c4 = st.columns(4)
 
-    c1.metric("Monitoreos Totales", total_monitoreos)
+    c1.metric("Monitoreos Totales", kpis["monitoreos"])
 
     c2.metric(
     "Promedio General (Total puntos)",
-    f"{df_filtrado['Total'].mean():.2f}" if "Total" in df_filtrado.columns else "0.00"
+    f"{kpis['promedio_total']:.2f}"
     )
 
     c3.metric(
     "Errores Críticos",
-    len(df_filtrado[df_filtrado["Error crítico"] == "Sí"])
+    kpis["errores_criticos"]
     )
 
     c4.metric(
     "Promedio Monitoreos por Asesor",
-    f"{promedio_monitoreos_asesor:.2f}"
+    f"{kpis['promedio_por_asesor']:.2f}"
     )
 
     st.subheader("📊 Distribución de Monitoreos – Conecta UR")
 
-    monit_por_asesor = df_filtrado.groupby("Asesor").size().reset_index(name="Monitoreos").sort_values("Monitoreos", ascending=False)
-    fig_asesores = px.bar(monit_por_asesor, x="Asesor", y="Monitoreos", title="Cantidad de Monitoreos por Asesor", text="Monitoreos", color="Monitoreos")
-    fig_asesores.update_layout(xaxis_tickangle=-45)
+    clave_figuras = (pagina, clave_filtros(filtros), agregados["version"])
+
+    fig_asesores = figura_monitoreos_por(cubo_f, *clave_figuras, "Asesor", "Monitoreos", "Cantidad de Monitoreos por Asesor")
     st.plotly_chart(fig_asesores, use_container_width=True)
 
-    monit_por_monitor = df_filtrado.groupby("Monitor").size().reset_index(name="Monitoreos realizados").sort_values("Monitoreos realizados", ascending=False)
-    fig_monitor = px.bar(monit_por_monitor, x="Monitor", y="Monitoreos realizados", title="Cantidad de Monitoreos Realizados por Monitor", text="Monitoreos realizados", color="Monitoreos realizados")
-    fig_monitor.update_layout(xaxis_tickangle=-45)
+    fig_monitor = figura_monitoreos_por(cubo_f, *clave_figuras, "Monitor", "Monitoreos realizados", "Cantidad de Monitoreos Realizados por Monitor")
     st.plotly_chart(fig_monitor, use_container_width=True)
 
     st.subheader("🔥 Cumplimiento por Pregunta – Conecta UR")
 
-    for canal_actual in df_filtrado["Canal"].unique():
+    figuras = figuras_cumplimiento(cubo_f, *clave_figuras)
+
+    for canal_actual in cubo_f["Canal"].unique():
         st.markdown(f"### 📌 Canal: **{canal_actual}**")
-        df_c = df_filtrado[df_filtrado["Canal"] == canal_actual]
 
-        orden_formulario = obtener_preguntas("Conecta UR", canal_actual)
-        if not orden_formulario:
+        if not obtener_preguntas("Conecta UR", canal_actual):
             st.info("No hay preguntas configuradas para este canal.")
             continue
 
-        cumplimiento_canal = []
-        for p in orden_formulario:
-            if p not in df_c.columns:
-                continue
-            valores = pd.to_numeric(df_c[p], errors="coerce").fillna(0)
-            pct = (valores > 0).mean() * 100
-            cumplimiento_canal.append({"Pregunta": p, "Cumplimiento": pct})
-
-        if not cumplimiento_canal:
+        if ("Conecta UR", canal_actual) not in figuras:
             st.info("Aún no hay columnas de preguntas registradas para este canal.")
             continue
 
-        df_preg_canal = pd.DataFrame(cumplimiento_canal)
-        mapa_orden = {preg: idx for idx, preg in enumerate(orden_formulario)}
-        df_preg_canal["orden"] = df_preg_canal["Pregunta"].map(mapa_orden)
-        df_preg_canal = df_preg_canal.sort_values("orden", ascending=False)
-
-        df_preg_canal["Pregunta_wrapped"] = df_preg_canal["Pregunta"].apply(lambda x: envolver_pregunta(x, 45))
-
-        fig_h = px.bar(
-            df_preg_canal,
-            x="Cumplimiento",
-            y="Pregunta_wrapped",
-            orientation="h",
-            color="Cumplimiento",
-            color_continuous_scale="RdYlGn",
-            title=f"Cumplimiento por Criterio – {canal_actual}",
-            range_x=[0, 100]
-        )
-        fig_h.update_traces(texttemplate="%{x:.1f}%", textposition="outside")
-        fig_h = ajustar_grafico_horizontal(fig_h, df_preg_canal, "Pregunta_wrapped")
-        st.plotly_chart(fig_h, use_container_width=True)
+        st.plotly_chart(figuras[("Conecta UR", canal_actual)], use_container_width=True)
 # ===================================================================== 
 # 🎯 DASHBOARD POR ASESOR
 # =====================================================================
 
 elif pagina == "🎯 Dashboard por Asesor":
 
-    df = cargar_todas_las_hojas_google_sheets()
+    df = obtener_dataset_analitico()
 
     if df.empty:
         st.warning("📭 No hay registros para mostrar aún.")
         st.stop()
 
-    df = df.dropna(how="all")
-    df.columns = [str(c).strip() for c in df.columns]
-    df = df.dropna(subset=["Área", "Asesor", "Canal"], how="any")
-
-    df["Fecha"] = pd.to_datetime(df["Fecha"], errors="coerce")
-    df["Mes"] = df["Fecha"].dt.month
-    df["Año"] = df["Fecha"].dt.year
-
     meses = {
         1:"Enero",2:"Febrero",3:"Marzo",4:"Abril",5:"Mayo",6:"Junio",
         7:"Julio",8:"Agosto",9:"Septiembre",10:"Octubre",11:"Noviembre",12:"Diciembre"
@@ -1103,52 +1821,58 @@ elif pagina == "🎯 Dashboard por Asesor":
     # ===============================
     st.sidebar.subheader("Filtros Asesor")
 
-    area_f = st.sidebar.selectbox("Área:", ["Todas"] + sorted(df["Área"].unique()))
-    canal_f = st.sidebar.selectbox("Canal:", ["Todos"] + sorted(df["Canal"].unique()))
-    anio_f = st.sidebar.selectbox("Año:", ["Todos"] + sorted(df["Año"].dropna().unique().astype(int)))
+    agregados = obtener_cubo_agregado(df)
+    cubo = agregados["cubo"]
+
+    area_f = st.sidebar.selectbox("Área:", ["Todas"] + sorted(cubo["Área"].unique()))
+    canal_f = st.sidebar.selectbox("Canal:", ["Todos"] + sorted(cubo["Canal"].unique()))
+    anio_f = st.sidebar.selectbox("Año:", ["Todos"] + sorted(cubo["Año"].dropna().unique().astype(int)))
     mes_f = st.sidebar.selectbox(
         "Mes:",
-        ["Todos"] + [meses[m] for m in sorted(df["Mes"].dropna().unique())]
+        ["Todos"] + [meses[m] for m in sorted(cubo["Mes"].dropna().unique())]
     )
 
-    df_f = df.copy()
+    filtros = {}
 
     if area_f != "Todas":
-        df_f = df_f[df_f["Área"] == area_f]
+        filtros["Área"] = area_f
     if canal_f != "Todos":
-        df_f = df_f[df_f["Canal"] == canal_f]
+        filtros["Canal"] = canal_f
     if anio_f != "Todos":
-        df_f = df_f[df_f["Año"] == int(anio_f)]
+        filtros["Año"] = int(anio_f)
     if mes_f != "Todos":
-        mes_num = [k for k, v in meses.items() if v == mes_f][0]
-        df_f = df_f[df_f["Mes"] == mes_num]
+        filtros["Mes"] = [k for k, v in meses.items() if v == mes_f][0]
 
-    if df_f.empty:
+    cubo_f = filtrar_por(cubo, filtros)
+
+    if cubo_f.empty:
         st.warning("No hay datos con los filtros seleccionados.")
         st.stop()
 
     asesor_sel = st.selectbox(
         "Seleccione un asesor para analizar:",
-        sorted(df_f["Asesor"].unique())
+        sorted(cubo_f["Asesor"].unique())
     )
 
-    df_asesor = df_f[df_f["Asesor"] == asesor_sel]
+    cubo_asesor = filtrar_por(cubo_f, {"Asesor": asesor_sel})
 
     st.markdown(f"## 👤 Análisis del Asesor: **{asesor_sel}**")
 
     # ===============================
     # MÉTRICAS GENERALES
     # ===============================
+    kpis = resumir_cubo(cubo_asesor)
+
     c1, c2, c3 = st.columns(3)
 
-    c1.metric("Monitoreos realizados", len(df_asesor))
+    c1.metric("Monitoreos realizados", kpis["monitoreos"])
 
-    puntaje_ponderado = calcular_ponderado_por_asesor(df_asesor)
+    puntaje_ponderado = calcular_puntajes_ponderados(cubo_asesor)["Puntaje ponderado"].iloc[0]
     c2.metric("🎯 Puntaje final ponderado", f"{puntaje_ponderado:.2f}")
 
     c3.metric(
         "Errores Críticos",
-        len(df_asesor[df_asesor["Error crítico"] == "Sí"])
+        kpis["errores_criticos"]
     )
 
     st.caption(
@@ -1160,100 +1884,42 @@ elif pagina == "🎯 Dashboard por Asesor":
     # ===============================
     # ANÁLISIS POR CANAL (CLAVE)
     # ===============================
-    area_asesor = df_asesor["Área"].iloc[0]
+    figuras = figuras_cumplimiento(
+        cubo_asesor,
+        pagina,
+        clave_filtros({**filtros, "Asesor": asesor_sel}),
+        agregados["version"],
+        titulo="Cumplimiento por criterio"
+    )
 
-    for canal_actual in df_asesor["Canal"].unique():
+    for area_actual, canal_actual in cubo_asesor[["Área", "Canal"]].drop_duplicates().itertuples(index=False):
 
         st.markdown(f"### 📌 Canal: **{canal_actual}**")
 
-        df_canal = df_asesor[df_asesor["Canal"] == canal_actual]
-
-        orden_formulario = obtener_preguntas(area_asesor, canal_actual)
-
-        if not orden_formulario:
+        if not obtener_preguntas(area_actual, canal_actual):
             st.info("No hay preguntas configuradas para este canal.")
             continue
 
-        preguntas_cols = [p for p in orden_formulario if p in df_canal.columns]
-
-        if not preguntas_cols:
+        if (area_actual, canal_actual) not in figuras:
             st.info("No hay respuestas registradas para este canal.")
             continue
 
-        df_long = df_canal.melt(
-            id_vars=["Área", "Asesor", "Canal", "Fecha"],
-            value_vars=preguntas_cols,
-            var_name="Pregunta",
-            value_name="Puntaje"
-        )
-
-        df_long["Puntaje"] = pd.to_numeric(df_long["Puntaje"], errors="coerce").fillna(0)
-
-        df_preg = (
-            df_long.assign(Cumple=lambda d: d["Puntaje"] > 0)
-                   .groupby("Pregunta")["Cumple"]
-                   .mean()
-                   .reset_index(name="Cumplimiento")
-        )
-
-        df_preg["Cumplimiento"] *= 100
-
-        mapa_orden = {preg: idx for idx, preg in enumerate(orden_formulario)}
-        df_preg["orden"] = df_preg["Pregunta"].map(mapa_orden)
-
-        df_preg = (
-            df_preg
-            .dropna(subset=["orden"])
-            .sort_values("orden", ascending=False)
-        )
-
-        df_preg["Pregunta_wrapped"] = df_preg["Pregunta"].apply(
-            lambda x: envolver_pregunta(x, 45)
-        )
-
-        fig = px.bar(
-            df_preg,
-            x="Cumplimiento",
-            y="Pregunta_wrapped",
-            orientation="h",
-            color="Cumplimiento",
-            color_continuous_scale="RdYlGn",
-            title=f"Cumplimiento por criterio – {canal_actual}",
-            range_x=[0, 100]
-        )
-
-        fig.update_traces(
-            texttemplate="%{x:.1f}%",
-            textposition="outside"
-        )
-
-        fig = ajustar_grafico_horizontal(fig, df_preg, "Pregunta_wrapped")
-
-        st.plotly_chart(fig, use_container_width=True)
+        st.plotly_chart(figuras[(area_actual, canal_actual)], use_container_width=True)
 
 # =====================================================================
 # 📥 DESCARGA DE RESULTADOS
 # =====================================================================
 elif pagina == "📥 Descarga de resultados":
 
-    from io import BytesIO
-
     st.subheader("📥 Descarga de consolidado mensual")
 
-    df = cargar_todas_las_hojas_google_sheets()
+    df = obtener_dataset_analitico()
 
     if df.empty:
         st.warning("📭 No hay información disponible.")
         st.stop()
 
-    df = df.dropna(how="all")
-    df.columns = [str(c).strip() for c in df.columns]
-    df = df.dropna(subset=["Área", "Asesor", "Fecha", "Canal", "Total"])
-
-    df["Total"] = pd.to_numeric(df["Total"], errors="coerce").fillna(0)
-    df["Fecha"] = pd.to_datetime(df["Fecha"], errors="coerce")
-    df["Mes"] = df["Fecha"].dt.month
-    df["Año"] = df["Fecha"].dt.year
+    df = df.dropna(subset=["Fecha"])
 
     meses = {
         1: "Enero", 2: "Febrero", 3: "Marzo", 4: "Abril",
@@ -1295,11 +1961,8 @@ elif pagina == "📥 Descarga de resultados":
     # -------------------------------
     # PONDERADO FINAL POR ASESOR
     # -------------------------------
-    ponderado_asesor = (
-        df_f
-        .groupby("Asesor")
-        .apply(lambda x: calcular_ponderado_por_asesor(x))
-        .reset_index(name="Promedio de Total de puntos")
+    ponderado_asesor = calcular_puntajes_ponderados(df_f).rename(
+        columns={"Puntaje ponderado": "Promedio de Total de puntos"}
     )
 
     # -------------------------------
@@ -1341,20 +2004,24 @@ elif pagina == "📥 Descarga de resultados":
     # -------------------------------
     # DESCARGA EXCEL
     # -------------------------------
-    buffer = BytesIO()
+    incluir_monitoreos = st.checkbox(
+        "Incluir todos los monitoreos (una hoja por Área - Canal)"
+    )
 
-    with pd.ExcelWriter(buffer, engine="xlsxwriter") as writer:
-        consolidado.to_excel(
-            writer,
-            index=False,
-            sheet_name="Consolidado"
-        )
+    if incluir_monitoreos:
+        inicio_mes = date(int(anio_f), int(mes_num), 1)
+        fin_mes = (pd.Timestamp(inicio_mes) + pd.offsets.MonthEnd(0)).date()
+        periodo = st.date_input("Periodo de los monitoreos:", (inicio_mes, fin_mes))
 
-    buffer.seek(0)
+    def generar_descarga():
+        monitoreos = None
+        if incluir_monitoreos and len(periodo) == 2:
+            monitoreos = monitoreos_para_exportar(df, *periodo)
+        return generar_excel_resultados(consolidado, monitoreos)
 
     st.download_button(
         label="📥 Descargar archivo consolidado",
-        data=buffer,
+        data=generar_descarga,
         file_name=f"Resultados_{area_f}_{anio_f}_{mes_f}.xlsx",
         mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
     )
@@ -1364,6 +2031,11 @@ elif pagina == "📥 Descarga de resultados":
 
 elif pagina == "🧠 IA":
 
+    from concurrent.futures import ThreadPoolExecutor, as_completed
+
+    from reglas_ia import evaluar_transcripcion, construir_fila_ia
+    from transcripcion import GEMINI_MAX_CONCURRENCIA, transcribir_grabacion
+
     st.markdown("## 🧠 Monitoreo Automático con IA – Servicio")
 
     canal = "Servicio"
@@ -1375,126 +2047,164 @@ elif pagina == "🧠 IA":
     area = st.selectbox("Área:", list(areas.keys()))
     asesor = st.selectbox("Asesor:", areas[area]["asesores"])
 
-    audio_file = st.file_uploader(
-        "Sube la grabación de la llamada",
-        type=["mp3", "wav", "m4a"]
+    audios = st.file_uploader(
+        "Sube las grabaciones de las llamadas",
+        type=["mp3", "wav", "m4a"],
+        accept_multiple_files=True
     )
 
+    # Modo lote: un asesor por grabación (por defecto el seleccionado)
+    if len(audios) > 1:
+        asignacion = st.data_editor(
+            pd.DataFrame({"Archivo": [a.name for a in audios], "Asesor": asesor}),
+            column_config={
+                "Archivo": st.column_config.TextColumn(disabled=True),
+                "Asesor": st.column_config.SelectboxColumn(
+                    options=areas[area]["asesores"], required=True
+                )
+            },
+            hide_index=True,
+            use_container_width=True
+        )
+
     # ===============================
     # BOTÓN EVALUAR
     # ===============================
     if st.button("🚀 Evaluar"):
 
-        if audio_file is None:
+        if not audios:
             st.warning("Debes subir un audio.")
             st.stop()
 
-        # 🎙 TRANSCRIPCIÓN
-        with st.spinner("🎙 Transcribiendo con Gemini..."):
-            texto_llamada = transcribir_audio_gemini(audio_file)
+        if len(audios) == 1:
 
-        if not texto_llamada:
-            st.stop()
+            # 🎙 TRANSCRIPCIÓN
+            with st.spinner("🎙 Transcribiendo con Gemini..."):
+                texto_llamada = transcribir_audio_gemini(audios[0])
 
-        st.success("Audio transcrito correctamente")
-
-        with st.expander("📄 Ver transcripción"):
-            st.write(texto_llamada)
-
-        texto = texto_llamada.lower()
-
-        preguntas = obtener_preguntas(area, canal)
-        pesos = obtener_pesos(area, canal)
-
-        resultados = {}
-        total = 0
-
-        # ===============================
-        # EVALUACIÓN SEGÚN MATRIZ OFICIAL
-        # ===============================
-
-        for pregunta, peso in zip(preguntas, pesos):
-
-            puntaje = 0
-            pregunta_lower = pregunta.lower()
-
-            # 1️⃣ INMEDIATEZ
-            if "atiende la interacción" in pregunta_lower:
-                if "buen" in texto[:120] or "hola" in texto[:120]:
-                    puntaje = peso
-
-            # 2️⃣ SALUDO Y PROTOCOLO
-            elif "saluda" in pregunta_lower:
-                if ("casa ur" in texto or "conecta ur" in texto) and ("buen" in texto or "hola" in texto):
-                    puntaje = peso
-
-            # 3️⃣ SEGURIDAD
-            elif "validación de identidad" in pregunta_lower:
-                validaciones = 0
-                if "cédula" in texto or "documento" in texto:
-                    validaciones += 1
-                if "fecha de nacimiento" in texto:
-                    validaciones += 1
-                if "correo" in texto or "teléfono" in texto:
-                    validaciones += 1
-
-                if validaciones >= 3:
-                    puntaje = peso
-
-            # 4️⃣ ESCUCHA ACTIVA
-            elif "escucha activamente" in pregunta_lower:
-                if "entiendo" in texto or "me confirma" in texto or "permítame validar" in texto:
-                    puntaje = peso
-
-            # 5️⃣ TIEMPOS DE ESPERA
-            elif "tiempos de espera" in pregunta_lower:
-                if "permítame un momento" in texto or "en línea" in texto:
-                    puntaje = peso
-
-            # 6️⃣ VALIDACIÓN DE CIERRE
-            elif "valida con el usuario" in pregunta_lower:
-                if "requiere algo adicional" in texto or "la información fue clara" in texto:
-                    puntaje = peso
-
-            # 7️⃣ DESPEDIDA
-            elif "finaliza la atención" in pregunta_lower:
-                if "gracias por comunicarse" in texto or "feliz día" in texto:
-                    puntaje = peso
-
-            resultados[pregunta] = puntaje
-            total += puntaje
-
-        # ===============================
-        # GENERAR ASPECTOS
-        # ===============================
-        aspectos_positivos = [p for p, v in resultados.items() if v > 0]
-        aspectos_mejorar = [p for p, v in resultados.items() if v == 0]
-
-        # ===============================
-        # GUARDAR SIN CREAR COLUMNAS NUEVAS
-        # ===============================
-        fila = {
-            "Área": area,
-            "Canal": canal,
-            "Monitor": monitor,
-            "Asesor": asesor,
-            "Código": f"IA-{int(time.time())}",
-            "Fecha": date.today(),
-            "Error crítico": "No",
-            "Total": total,
-            "Aspectos positivos": "\n".join(aspectos_positivos),
-            "Aspectos por Mejorar": "\n".join(aspectos_mejorar)
-        }
+            if not texto_llamada:
+                st.stop()
+
+            st.success("Audio transcrito correctamente")
+
+            with st.expander("📄 Ver transcripción"):
+                st.write(texto_llamada)
+
+            resultados, total, evidencias = evaluar_transcripcion(texto_llamada, area, canal)
 
-        for pregunta, valor in resultados.items():
-            fila[pregunta] = valor
+            guardar_datos_google_sheets(construir_fila_ia(area, asesor, resultados, total))
 
-        guardar_datos_google_sheets(fila)
+            # ===============================
+            # RESULTADO
+            # ===============================
+            st.success("✅ Evaluación completada correctamente")
+            st.metric("🎯 Puntaje Total", total)
+            st.write("### Resultado por criterio")
+            st.dataframe(
+                pd.DataFrame({
+                    "Criterio": list(resultados),
+                    "Puntaje": list(resultados.values()),
+                    "Frase detectada": list(evidencias.values())
+                }),
+                hide_index=True,
+                use_container_width=True
+            )
+
+        else:
+
+            # ===============================
+            # LOTE: TRANSCRIPCIÓN CONCURRENTE
+            # ===============================
+            estado = asignacion.assign(Estado="⏳ En cola", Puntaje=None)
+            progreso = st.progress(0.0, text=f"0/{len(audios)} grabaciones procesadas")
+            tabla_estado = st.empty()
+            tabla_estado.dataframe(estado, hide_index=True, use_container_width=True)
+
+            api_key = st.secrets["GEMINI_API_KEY"]
+            limitador = obtener_limitador_gemini()
+            lote = int(time.time())
+            filas = []
+
+            # Las transcripciones corren en hilos del pool: sus spans quedan en "(segundo plano)"
+            with metricas.medir("lote_ia"), ThreadPoolExecutor(max_workers=GEMINI_MAX_CONCURRENCIA) as pool:
+                futuros = {
+                    pool.submit(transcribir_grabacion, a, a.type, api_key, limitador): i
+                    for i, a in enumerate(audios)
+                }
+
+                for n, futuro in enumerate(as_completed(futuros), start=1):
+                    i = futuros[futuro]
+                    try:
+                        resultados, total, _ = evaluar_transcripcion(futuro.result(), area, canal)
+                        filas.append(construir_fila_ia(
+                            area, estado.at[i, "Asesor"], resultados, total, codigo=f"IA-{lote}-{i + 1}"
+                        ))
+                        estado.at[i, "Estado"] = "✅ Evaluado"
+                        estado.at[i, "Puntaje"] = total
+                    except Exception as e:
+                        estado.at[i, "Estado"] = f"❌ {e}"
+
+                    progreso.progress(n / len(audios), text=f"{n}/{len(audios)} grabaciones procesadas")
+                    tabla_estado.dataframe(estado, hide_index=True, use_container_width=True)
+
+            # Guardado al final, en un solo lote del outbox
+            for fila in filas:
+                guardar_datos_google_sheets(fila)
+
+            st.success(f"✅ {len(filas)} de {len(audios)} evaluaciones guardadas")
+
+# =====================================================================
+# 🛠️ RENDIMIENTO (solo con ?admin=…)
+# =====================================================================
+
+elif pagina == PAGINA_RENDIMIENTO:
+
+    st.markdown("## 🛠️ Rendimiento del proceso")
+    st.caption(
+        f"Percentiles móviles sobre las últimas {metricas.VENTANA_MUESTRAS} muestras de cada span, "
+        "por página. Los hilos en segundo plano (outbox, refresco, lote IA) van aparte."
+    )
+
+    percentiles = pd.DataFrame(metricas.percentiles())
+    if percentiles.empty:
+        st.info("Aún no hay mediciones en este proceso.")
+    else:
+        paginas_medidas = ["Todas"] + sorted(percentiles["pagina"].unique())
+        pagina_sel = st.selectbox("Página:", paginas_medidas)
+        if pagina_sel != "Todas":
+            percentiles = percentiles[percentiles["pagina"] == pagina_sel]
+        st.dataframe(percentiles, hide_index=True, use_container_width=True)
+
+    st.markdown("### 🗃️ Cachés")
+    st.dataframe(pd.DataFrame(metricas.resumen_caches()), hide_index=True, use_container_width=True)
+
+    st.markdown("### 🔢 Contadores")
+    externos = contadores_externos()
+    st.dataframe(
+        pd.DataFrame(
+            list({**metricas.contadores(), **externos}.items()),
+            columns=["Contador", "Valor"]
+        ),
+        hide_index=True,
+        use_container_width=True
+    )
+
+    col1, col2, col3 = st.columns(3)
+    col1.download_button(
+        "⬇️ Métricas (JSON)",
+        data=metricas.exportar_json(externos),
+        file_name=f"metricas_{date.today():%Y%m%d}.json",
+        mime="application/json"
+    )
+    col2.download_button(
+        "⬇️ Métricas (CSV)",
+        data=metricas.exportar_csv(externos),
+        file_name=f"metricas_{date.today():%Y%m%d}.csv",
+        mime="text/csv"
+    )
+    if col3.button("🔄 Reiniciar métricas"):
+        metricas.reiniciar()
+        st.rerun()
 
-        # ===============================
-        # RESULTADO
-        # ===============================
-        st.success("✅ Evaluación completada correctamente")
-        st.metric("🎯 Puntaje Total", total)
-        st.write("### Resultado por criterio")
-        st.write(resultados)
+# Duración total del rerun (los que terminan en st.stop() no se registran)
+metricas.registrar("rerun", (time.perf_counter() - inicio_rerun) * 1000)
@@ -0,0 +1,7 @@
+"""
+Benchmarks de la app (se ejecutan a mano, no forman parte de la app):
+
+    python -m benchmarks.importacion   # costo de importación por página
+    python -m benchmarks.escenarios    # carga, dashboards, descarga e IA con datos sintéticos
+    python -m benchmarks.casos_borde   # casos borde de Sheets y de la unión de tramos transcritos
+"""
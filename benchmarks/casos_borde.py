@@ -0,0 +1,149 @@
+"""
+Casos borde de la lectura y escritura en Sheets (contra el LibroFalso, sin la
+hoja real) y de la unión de tramos de transcripción:
+
+    python -m benchmarks.casos_borde
+
+Cada caso arma su propio libro sintético y falla con AssertionError si la
+app deja de comportarse como se espera.
+"""
+import threading
+import time
+
+from benchmarks.datos_sinteticos import generar_hojas
+from benchmarks.escenarios import cargar_app, usar_libro_falso
+from benchmarks.sheets_falso import LibroFalso
+
+N_FILAS = 500
+
+
+def libro_sintetico(app, semilla=0):
+    hojas = generar_hojas(N_FILAS, app.areas, semilla)
+    libro = LibroFalso(hojas)
+    usar_libro_falso(app, libro)
+    return libro, hojas
+
+
+def caso_hoja_renombrada(app):
+    """Tras renombrar una hoja, la carga vuelve a listar el libro en lugar de fallar."""
+    libro, hojas = libro_sintetico(app)
+    app._cargar_desde_google_sheets()
+
+    titulo = next(t for t, v in hojas.items() if len(v) > 1)
+    libro.renombrar_hoja(titulo, f"Archivo {titulo}")  # deja de ser "Área - Canal"
+    df = app._cargar_desde_google_sheets()
+    assert len(df) == N_FILAS - (len(hojas[titulo]) - 1), len(df)
+
+
+def caso_hoja_nueva(app):
+    """Una hoja "Área - Canal" creada después del primer listado aparece al relistar (TTL)."""
+    libro, hojas = libro_sintetico(app)
+    titulo = next(iter(hojas))
+    hojas_previas = {t: v for t, v in hojas.items() if t != titulo}
+    libro = LibroFalso(hojas_previas)
+    usar_libro_falso(app, libro)
+    antes = len(app._cargar_desde_google_sheets())
+
+    libro.agregar_hoja(titulo, hojas[titulo])
+    app.obtener_hojas_google_sheets.clear()  # lo que hace el TTL de la app
+    despues = len(app._cargar_desde_google_sheets())
+    assert despues == antes + len(hojas[titulo]) - 1, (antes, despues)
+
+
+def caso_hoja_sin_encabezado(app):
+    """Una hoja "Área - Canal" vacía no rompe las cargas siguientes y sus filas aparecen al llenarla."""
+    hojas = generar_hojas(N_FILAS, app.areas)
+    sitio = hojas.pop("Conecta UR - Sitio")
+    libro = LibroFalso({**hojas, "Conecta UR - Sitio": []})
+    usar_libro_falso(app, libro)
+    sin_sitio = N_FILAS - (len(sitio) - 1)
+
+    for _ in range(2):
+        assert len(app._cargar_desde_google_sheets()) == sin_sitio
+
+    libro.worksheet("Conecta UR - Sitio").valores.extend(sitio)
+    assert len(app._cargar_desde_google_sheets()) == N_FILAS
+
+
+def caso_version_y_snapshot(app):
+    """La versión solo cambia con los datos y el snapshot solo se reescribe cuando cambia."""
+    libro, hojas = libro_sintetico(app)
+    escrituras = []
+    guardar_snapshot = app.guardar_snapshot
+    app.guardar_snapshot = lambda df, version: escrituras.append(version)
+    try:
+        app.obtener_estado_snapshot()["version_guardada"] = None
+        v1 = app._sincronizar_con_google_sheets().attrs["version_datos"]
+        v2 = app._sincronizar_con_google_sheets().attrs["version_datos"]
+        assert v1 == v2 and escrituras == [v1], (v1, v2, escrituras)
+
+        titulo = next(t for t, v in hojas.items() if len(v) > 1)
+        libro.worksheet(titulo).valores.append(list(hojas[titulo][1]))
+        v3 = app._sincronizar_con_google_sheets().attrs["version_datos"]
+        assert v3 != v1 and escrituras == [v1, v3], escrituras
+    finally:
+        app.guardar_snapshot = guardar_snapshot
+
+
+def caso_despachadores_concurrentes(app):
+    """Dos despachadores a la vez (p. ej. tras "Clear cache") escriben cada fila una sola vez."""
+    hojas = generar_hojas(N_FILAS, app.areas)
+    libro = LibroFalso(hojas, latencia_seg=0.05)
+    usar_libro_falso(app, libro)
+
+    hoja = libro.worksheet("Casa UR - Chat")
+    antes = len(hoja.valores)
+    fila = dict(zip(hoja.valores[0], hoja.valores[1]))
+    app.guardar_datos_google_sheets(fila)
+
+    hilos = [threading.Thread(target=app.despachar_outbox) for _ in range(4)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+
+    # El despachador en segundo plano de la app también compite: se espera a que vacíe el outbox
+    limite = time.time() + 30
+    while app.resumen_outbox()["pendientes"] and time.time() < limite:
+        time.sleep(0.1)
+
+    assert app.resumen_outbox()["pendientes"] == 0
+    assert len(hoja.valores) == antes + 1, len(hoja.valores) - antes
+
+
+def caso_union_de_tramos(app):
+    """El solape se quita aunque el borde salga recortado, pero una frase repetida más atrás no borra texto."""
+    from transcripcion import unir_transcripciones
+
+    recortado = unir_transcripciones([
+        "buenos días, hablamos el día de hoy con el señ",
+        "ía de hoy con el señor Pérez sobre su matrícula"
+    ])
+    assert recortado == "buenos días, hablamos el día de hoy con el señor Pérez sobre su matrícula", recortado
+
+    solape_perdido = unir_transcripciones([
+        "gracias por comunicarse con casa ur en que le puedo ayudar necesito un certificado",
+        "en que le puedo ayudar adicional"
+    ])
+    assert "necesito un certificado" in solape_perdido, solape_perdido
+
+
+CASOS = [
+    caso_hoja_renombrada,
+    caso_hoja_nueva,
+    caso_hoja_sin_encabezado,
+    caso_version_y_snapshot,
+    caso_despachadores_concurrentes,
+    caso_union_de_tramos
+]
+
+
+def main():
+    app = cargar_app()
+    for caso in CASOS:
+        caso(app)
+        print(f"✅ {caso.__name__}")
+
+
+if __name__ == "__main__":
+    main()
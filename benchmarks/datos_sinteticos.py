@@ -0,0 +1,93 @@
+"""
+Monitoreos sintéticos con la misma forma que las hojas "Área - Canal":
+áreas, canales, monitores y asesores del dict `areas` de la app, preguntas y
+pesos de rubricas.py, y valores como texto (igual que los devuelve Sheets).
+"""
+import numpy as np
+
+from rubricas import obtener_pesos, obtener_preguntas, obtener_rubrica
+
+ENCABEZADOS_BASE = [
+    "Área", "Canal", "Monitor", "Asesor", "Código", "Fecha",
+    "Error crítico", "Total", "Aspectos positivos", "Aspectos por Mejorar"
+]
+
+TEXTOS_POSITIVOS = [
+    "Buen manejo del usuario",
+    "Claridad en la respuesta",
+    "Saludo y despedida completos\nValidación de identidad",
+    "Empatía con el usuario",
+    ""
+]
+
+TEXTOS_MEJORAR = [
+    "Control de tiempos de espera",
+    "Validación de identidad",
+    "Uso de herramientas de consulta\nDocumentación del caso",
+    "Ortografía en la respuesta",
+    ""
+]
+
+FRASES_LLAMADA = [
+    "hola buen día bienvenido a casa ur", "buenas tardes conecta ur le saluda",
+    "me confirma su número de cédula", "su documento por favor", "fecha de nacimiento",
+    "su correo electrónico", "un teléfono de contacto", "entiendo su solicitud",
+    "permítame validar en el sistema", "permítame un momento", "sigo en línea con usted",
+    "requiere algo adicional", "la información fue clara", "gracias por comunicarse",
+    "que tenga un feliz día", "el trámite de homologación", "la matrícula del semestre"
+]
+
+
+def _fechas(rng, m, desde="2024-01-01", dias=730):
+    inicio = np.datetime64(desde, "D")
+    return np.datetime_as_string(inicio + rng.integers(0, dias, m), unit="D")
+
+
+def generar_hoja(rng, areas, area, canal, m, codigo_inicial=0, encabezados_largos=False):
+    """Valores de una hoja: [encabezados] + m filas, todo como texto."""
+    preguntas = obtener_preguntas(area, canal)
+    pesos = np.array(obtener_pesos(area, canal))
+    columnas = list(preguntas) if encabezados_largos else [q.id for q in obtener_rubrica(area, canal).preguntas]
+
+    critico = rng.random(m) < 0.05
+    cumple = (rng.random((m, len(pesos))) > 0.3) & ~critico[:, None]
+    puntos = cumple * pesos
+
+    datos = np.empty((m, len(ENCABEZADOS_BASE) + len(columnas)), dtype=object)
+    datos[:, 0] = area
+    datos[:, 1] = canal
+    datos[:, 2] = rng.choice(areas[area]["monitores"], m)
+    datos[:, 3] = rng.choice(areas[area]["asesores"], m)
+    datos[:, 4] = np.arange(codigo_inicial, codigo_inicial + m).astype(str)
+    datos[:, 5] = _fechas(rng, m)
+    datos[:, 6] = np.where(critico, "Sí", "No")
+    datos[:, 7] = puntos.sum(axis=1).astype(str)
+    datos[:, 8] = rng.choice(TEXTOS_POSITIVOS, m)
+    datos[:, 9] = rng.choice(TEXTOS_MEJORAR, m)
+    datos[:, len(ENCABEZADOS_BASE):] = puntos.astype(str)
+
+    return [ENCABEZADOS_BASE + columnas] + datos.tolist()
+
+
+def generar_hojas(n, areas, semilla=0, encabezados_largos=False):
+    """
+    n monitoreos repartidos al azar entre todas las hojas "Área - Canal":
+    {título: [encabezados, fila, ...]}
+    """
+    rng = np.random.default_rng(semilla)
+    combinaciones = [(a, c) for a in areas for c in areas[a]["canales"] if obtener_preguntas(a, c)]
+    por_hoja = rng.multinomial(n, [1 / len(combinaciones)] * len(combinaciones))
+
+    hojas, codigo = {}, 0
+    for (area, canal), m in zip(combinaciones, por_hoja):
+        hojas[f"{area} - {canal}"] = generar_hoja(rng, areas, area, canal, m, codigo, encabezados_largos)
+        codigo += m
+    return hojas
+
+
+def generar_transcripciones(k, semilla=0, frases_por_llamada=12):
+    rng = np.random.default_rng(semilla)
+    return [
+        ". ".join(rng.choice(FRASES_LLAMADA, frases_por_llamada))
+        for _ in range(k)
+    ]
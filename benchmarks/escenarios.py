@@ -0,0 +1,250 @@
+"""
+Escenarios cronometrados sobre datos sintéticos, sin tocar la hoja real:
+app.py se importa en modo "bare" de Streamlit y su conexión a Sheets se
+reemplaza por un LibroFalso en memoria.
+
+    python -m benchmarks.escenarios --tamanos 10000 100000 --salida reporte.json
+    python -m benchmarks.escenarios --tamanos 10000 --comparar reporte.json
+
+El reporte JSON guarda, por tamaño y escenario, la mediana y el mínimo en ms;
+--comparar muestra la razón contra un reporte anterior.
+"""
+import argparse
+import importlib
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from benchmarks.datos_sinteticos import generar_hojas, generar_transcripciones
+from benchmarks.sheets_falso import LibroFalso
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+TRANSCRIPCIONES_IA = 1000  # fijo: el puntaje IA no depende del tamaño de la hoja
+
+
+def cargar_app():
+    """
+    Importa app.py sin servidor de Streamlit. Outbox, snapshot y caché de
+    transcripciones van a un directorio temporal para no tocar los reales.
+    """
+    temporal = tempfile.mkdtemp(prefix="bench_monitoreo_")
+    os.environ["MONITOREO_OUTBOX"] = os.path.join(temporal, "outbox.sqlite3")
+    os.environ["MONITOREO_SNAPSHOT"] = os.path.join(temporal, "snapshot.feather")
+    os.environ["MONITOREO_CACHE_TRANSCRIPCIONES"] = os.path.join(temporal, "cache_transcripciones")
+    logging.getLogger("streamlit").setLevel(logging.ERROR)
+
+    if RAIZ not in sys.path:
+        sys.path.insert(0, RAIZ)
+    return importlib.import_module("app")
+
+
+def usar_libro_falso(app, libro):
+    """
+    Reemplaza la conexión compartida de la app (las funciones la buscan por nombre).
+    El mapa de hojas se lista una vez y admite .clear(), como el de la app.
+    """
+    hojas = {}
+
+    def obtener_hojas():
+        if not hojas:
+            hojas.update({ws.title: ws for ws in libro.worksheets()})
+        return hojas
+
+    obtener_hojas.clear = hojas.clear
+    app.obtener_libro_google_sheets = lambda: libro
+    app.obtener_hojas_google_sheets = obtener_hojas
+    app.obtener_estado_carga_incremental.clear()
+
+
+def cronometrar(funcion, repeticiones, preparar=None):
+    tiempos = []
+    for _ in range(repeticiones):
+        if preparar:
+            preparar()
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    return {
+        "mediana_ms": round(statistics.median(tiempos) * 1000, 2),
+        "min_ms": round(min(tiempos) * 1000, 2),
+        "repeticiones": repeticiones
+    }
+
+
+def consolidado_descarga(app, df):
+    """Mismo consolidado por asesor que la página 📥 Descarga."""
+    ponderado = app.calcular_puntajes_ponderados(df).rename(
+        columns={"Puntaje ponderado": "Promedio de Total de puntos"}
+    )
+    consolidado = (
+        df.groupby("Asesor")
+        .agg(**{
+            "Cantida Monitoreos": ("Asesor", "count"),
+            "Aspectos Positivos": ("Aspectos positivos", app.consolidar_texto),
+            "Aspectos Por Mejorar": ("Aspectos por Mejorar", app.consolidar_texto)
+        })
+        .reset_index()
+        .rename(columns={"Asesor": "Nombre Asesor"})
+    )
+    return consolidado.merge(ponderado, left_on="Nombre Asesor", right_on="Asesor", how="left").drop(columns=["Asesor"])
+
+
+def dashboard_area(app, cubo, area):
+    cubo_f = app.filtrar_por(cubo, {"Área": area})
+    app.resumir_cubo(cubo_f)
+    app.monitoreos_por(cubo_f, "Asesor", "Monitoreos")
+    app.monitoreos_por(cubo_f, "Monitor", "Monitoreos realizados")
+    app.calcular_cumplimiento(cubo_f)
+
+
+def dashboard_asesor(app, cubo):
+    asesor = cubo.groupby("Asesor")["Monitoreos"].sum().idxmax()
+    cubo_asesor = app.filtrar_por(cubo, {"Asesor": asesor})
+    app.resumir_cubo(cubo_asesor)
+    app.calcular_puntajes_ponderados(cubo_asesor)
+    app.calcular_cumplimiento(cubo_asesor)
+
+
+def ejecutar_escenarios(app, n, repeticiones, semilla=0, latencia_seg=0.0):
+    from reglas_ia import evaluar_transcripcion
+
+    hojas = generar_hojas(n, app.areas, semilla)
+    libro = LibroFalso(hojas, latencia_seg)
+    usar_libro_falso(app, libro)
+    r = {}
+
+    # ================= CARGA =================
+    r["carga_completa"] = cronometrar(
+        app._cargar_desde_google_sheets, repeticiones,
+        preparar=app.obtener_estado_carga_incremental.clear
+    )
+
+    nuevas = generar_hojas(max(1, n // 100), app.areas, semilla + 1)
+
+    def agregar_filas():
+        for title, valores in nuevas.items():
+            libro.worksheet(title).valores.extend(valores[1:])
+
+    app._cargar_desde_google_sheets()
+    r["carga_incremental_1pct"] = cronometrar(app._cargar_desde_google_sheets, repeticiones, preparar=agregar_filas)
+
+    libro = LibroFalso(hojas)
+    usar_libro_falso(app, libro)
+    df_crudo = app._cargar_desde_google_sheets()
+    llamadas = dict(libro.llamadas)
+
+    # ================= NORMALIZACIÓN =================
+    marcas = app.obtener_estado_carga_incremental()["hojas"]
+    r["version_datos"] = cronometrar(lambda: app.version_desde_marcas(marcas, list(marcas)), repeticiones)
+    version = df_crudo.attrs["version_datos"]
+
+    r["normalizacion"] = cronometrar(
+        lambda: app._preparar_dataset_analitico(df_crudo, version), repeticiones,
+        preparar=app._preparar_dataset_analitico.clear
+    )
+    df = app._preparar_dataset_analitico(df_crudo, version)
+
+    # ================= DASHBOARDS =================
+    r["cubo_agregado"] = cronometrar(
+        lambda: app.obtener_cubo_agregado(df), repeticiones,
+        preparar=app._construir_cubo_agregado.clear
+    )
+    cubo = app.obtener_cubo_agregado(df)["cubo"]
+
+    r["dashboard_casa_ur"] = cronometrar(lambda: dashboard_area(app, cubo, "Casa UR"), repeticiones)
+    r["dashboard_conecta_ur"] = cronometrar(lambda: dashboard_area(app, cubo, "Conecta UR"), repeticiones)
+    r["dashboard_asesor"] = cronometrar(lambda: dashboard_asesor(app, cubo), repeticiones)
+
+    # ================= DESCARGA =================
+    r["ponderado_por_asesor"] = cronometrar(lambda: app.calcular_puntajes_ponderados(df), repeticiones)
+    r["consolidar_texto"] = cronometrar(
+        lambda: df.groupby("Asesor")[["Aspectos positivos", "Aspectos por Mejorar"]].agg(app.consolidar_texto),
+        repeticiones
+    )
+    consolidado = consolidado_descarga(app, df)
+    desde, hasta = df["Fecha"].min(), df["Fecha"].max()
+    r["exportar_excel"] = cronometrar(
+        lambda: app.generar_excel_resultados(consolidado, app.monitoreos_para_exportar(df, desde, hasta)),
+        repeticiones
+    )
+
+    # ================= IA =================
+    transcripciones = generar_transcripciones(TRANSCRIPCIONES_IA, semilla)
+    r[f"puntaje_ia_{TRANSCRIPCIONES_IA}"] = cronometrar(
+        lambda: [evaluar_transcripcion(t, "Casa UR") for t in transcripciones],
+        repeticiones
+    )
+
+    return {"filas": len(df_crudo), "llamadas_sheets_por_carga": llamadas, "escenarios": r}
+
+
+def _commit_actual():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=RAIZ,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def comparar(reporte, anterior):
+    for tamano, actual in reporte["resultados"].items():
+        previo = anterior.get("resultados", {}).get(tamano)
+        if not previo:
+            continue
+        print(f"\n== {tamano} filas (vs {anterior.get('commit') or 'anterior'}) ==")
+        for nombre, medida in actual["escenarios"].items():
+            base = previo["escenarios"].get(nombre)
+            if base:
+                razon = medida["mediana_ms"] / base["mediana_ms"] if base["mediana_ms"] else float("nan")
+                print(f"{nombre:<26} {base['mediana_ms']:>10.1f} → {medida['mediana_ms']:>10.1f} ms  x{razon:.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tamanos", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--latencia-ms", type=float, default=0.0, help="latencia simulada por llamada a Sheets")
+    parser.add_argument("--salida", help="archivo JSON del reporte")
+    parser.add_argument("--comparar", help="reporte JSON anterior para comparar")
+    args = parser.parse_args()
+
+    app = cargar_app()
+
+    reporte = {
+        "generado": datetime.now().isoformat(timespec="seconds"),
+        "commit": _commit_actual(),
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "repeticiones": args.repeticiones,
+        "resultados": {}
+    }
+
+    for n in args.tamanos:
+        print(f"== {n} monitoreos ==")
+        resultado = ejecutar_escenarios(app, n, args.repeticiones, args.semilla, args.latencia_ms / 1000)
+        for nombre, medida in resultado["escenarios"].items():
+            print(f"{nombre:<26} {medida['mediana_ms']:>10.1f} ms")
+        reporte["resultados"][str(n)] = resultado
+
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            json.dump(reporte, f, ensure_ascii=False, indent=2)
+
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            comparar(reporte, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
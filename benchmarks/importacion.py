@@ -0,0 +1,73 @@
+"""
+Costo de importación en frío por página: cada conjunto de módulos se importa
+en un proceso nuevo (sin caché de sys.modules) y se toma la mediana.
+
+"Antes" es lo que app.py importaba al inicio en cualquier página; el resto es
+lo que carga cada página la primera vez que se abre.
+
+    python -m benchmarks.importacion --repeticiones 7
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+BASE = ["streamlit", "pandas", "sqlite3", "rubricas"]
+
+DEPENDENCIAS_POR_PAGINA = {
+    "Antes (todo al inicio)": BASE + [
+        "pyarrow", "pyarrow.feather", "plotly.express", "gspread",
+        "oauth2client.service_account", "xlsxwriter", "requests",
+        "reglas_ia", "transcripcion"
+    ],
+    "📝 Formulario": BASE,
+    "📊 Dashboards": BASE + ["pyarrow.feather", "gspread", "oauth2client.service_account", "plotly.express"],
+    "📥 Descarga": BASE + ["pyarrow.feather", "gspread", "oauth2client.service_account", "xlsxwriter"],
+    "🧠 IA": BASE + ["reglas_ia", "transcripcion"],
+}
+
+_MEDIR = """
+import sys, time
+inicio = time.perf_counter()
+for modulo in sys.argv[1:]:
+    __import__(modulo)
+print(time.perf_counter() - inicio)
+"""
+
+
+def medir_importacion(modulos):
+    salida = subprocess.run(
+        [sys.executable, "-c", _MEDIR, *modulos],
+        cwd=RAIZ, capture_output=True, text=True, check=True
+    )
+    return float(salida.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeticiones", type=int, default=5)
+    parser.add_argument("--json", help="guarda el resultado en este archivo")
+    args = parser.parse_args()
+
+    medir_importacion(DEPENDENCIAS_POR_PAGINA["Antes (todo al inicio)"])  # calienta la caché de disco
+
+    resultado = {}
+    for pagina, modulos in DEPENDENCIAS_POR_PAGINA.items():
+        tiempos = [medir_importacion(modulos) for _ in range(args.repeticiones)]
+        resultado[pagina] = round(statistics.median(tiempos) * 1000, 1)
+
+    antes = resultado["Antes (todo al inicio)"]
+    for pagina, ms in resultado.items():
+        print(f"{pagina:<26} {ms:>8.1f} ms  ({ms / antes:.0%})")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"importacion_ms": resultado}, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Libro de Google Sheets en memoria con la parte de la API de gspread que usa
+la app (worksheets, worksheet, values_batch_get, row_values, append_rows).
+Cuenta las llamadas, puede simular latencia por llamada y permite crear o
+renombrar hojas para los casos borde.
+"""
+import re
+import time
+from collections import Counter
+
+from gspread.exceptions import WorksheetNotFound
+from gspread.utils import a1_to_rowcol
+
+_RANGO = re.compile(r"^([A-Z]*)(\d*):([A-Z]*)(\d*)$")
+
+
+def _columna(letras):
+    return a1_to_rowcol(f"{letras}1")[1]
+
+
+class HojaFalsa:
+    def __init__(self, libro, title, valores):
+        self.libro = libro
+        self.title = title
+        self.valores = valores
+
+    def row_values(self, fila):
+        self.libro._llamada("row_values")
+        return list(self.valores[fila - 1]) if fila <= len(self.valores) else []
+
+    def append_rows(self, filas, **kwargs):
+        self.libro._llamada("append_rows")
+        self.valores.extend([str(v) for v in f] for f in filas)
+
+    def recortar(self, rango):
+        """Subconjunto de valores para un rango A1 sin hoja ('1:1', 'A10:Q', None)."""
+        if not rango:
+            return self.valores
+
+        col_ini, fila_ini, col_fin, fila_fin = _RANGO.match(rango).groups()
+        filas = self.valores[int(fila_ini or 1) - 1:int(fila_fin) if fila_fin else None]
+        desde = _columna(col_ini) - 1 if col_ini else 0
+        hasta = _columna(col_fin) if col_fin else None
+        return [f[desde:hasta] for f in filas]
+
+
+class LibroFalso:
+    def __init__(self, hojas, latencia_seg=0.0):
+        """hojas: {título: [encabezados, fila, ...]} (ver datos_sinteticos.generar_hojas)."""
+        self.latencia_seg = latencia_seg
+        self.llamadas = Counter()
+        self._hojas = {title: HojaFalsa(self, title, valores) for title, valores in hojas.items()}
+
+    def _llamada(self, nombre):
+        self.llamadas[nombre] += 1
+        if self.latencia_seg:
+            time.sleep(self.latencia_seg)
+
+    def worksheets(self):
+        self._llamada("worksheets")
+        return list(self._hojas.values())
+
+    def worksheet(self, title):
+        self._llamada("worksheet")
+        if title not in self._hojas:
+            raise WorksheetNotFound(title)
+        return self._hojas[title]
+
+    def values_batch_get(self, rangos, **kwargs):
+        self._llamada("values_batch_get")
+        respuesta = []
+        for rango in rangos:
+            hoja, _, a1 = rango.partition("!")
+            title = hoja.strip("'").replace("''", "'")
+            if title not in self._hojas:
+                # Sheets responde 400 a todo el lote si un rango apunta a una hoja inexistente
+                raise ValueError(f"Unable to parse range: {rango}")
+            respuesta.append({"range": rango, "values": self._hojas[title].recortar(a1)})
+        return {"valueRanges": respuesta}
+
+    # ================= CAMBIOS DE ESTRUCTURA =================
+    def agregar_hoja(self, title, valores):
+        self._hojas[title] = HojaFalsa(self, title, valores)
+
+    def renombrar_hoja(self, title, nuevo):
+        # Objeto nuevo: los worksheet ya entregados conservan el título viejo, como en gspread
+        self._hojas[nuevo] = HojaFalsa(self, nuevo, self._hojas.pop(title).valores)
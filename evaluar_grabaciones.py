@@ -0,0 +1,154 @@
+"""
+Evalúa con IA una carpeta de grabaciones sin abrir la app (p. ej. en un
+trabajo nocturno). Usa la misma transcripción (transcripcion.py) y las mismas
+reglas (reglas_ia.py) que la página 🧠 IA.
+
+El manifiesto es un CSV con columnas Archivo, Área y Asesor (Archivo relativo
+a la carpeta). Las credenciales salen de .streamlit/secrets.toml, igual que
+en la app:
+
+    python evaluar_grabaciones.py grabaciones/ manifiesto.csv --salida resultados.csv
+    python evaluar_grabaciones.py grabaciones/ manifiesto.csv --salida resultados.parquet
+    python evaluar_grabaciones.py grabaciones/ manifiesto.csv --hojas   # escribe en Google Sheets
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import gspread
+import pandas as pd
+import streamlit as st
+from oauth2client.service_account import ServiceAccountCredentials
+
+from reglas_ia import construir_fila_ia, evaluar_transcripcion
+from rubricas import fila_para_encabezados, obtener_rubrica
+from transcripcion import (
+    GEMINI_INTERVALO_MIN_SEG, GEMINI_MAX_CONCURRENCIA, LimitadorGemini, transcribir_grabacion
+)
+
+SCOPE_GOOGLE = [
+    "https://spreadsheets.google.com/feeds",
+    "https://www.googleapis.com/auth/drive"
+]
+
+TIPOS_AUDIO = {
+    ".mp3": "audio/mpeg",
+    ".wav": "audio/wav",
+    ".m4a": "audio/mp4"
+}
+
+
+def leer_manifiesto(ruta, carpeta):
+    """
+    - Valida columnas, extensión, existencia del archivo y rúbrica Área - Servicio
+    - Retorna (grabaciones válidas, errores)
+    """
+    manifiesto = pd.read_csv(ruta, dtype=str).fillna("")
+    faltantes = {"Archivo", "Área", "Asesor"} - set(manifiesto.columns)
+    if faltantes:
+        raise SystemExit(f"El manifiesto no tiene las columnas: {', '.join(sorted(faltantes))}")
+
+    grabaciones, errores = [], []
+    for fila in manifiesto.itertuples(index=False):
+        archivo, area, asesor = fila.Archivo.strip(), fila.Área.strip(), fila.Asesor.strip()
+        ruta_audio = os.path.join(carpeta, archivo)
+        tipo = TIPOS_AUDIO.get(os.path.splitext(archivo)[1].lower())
+
+        if tipo is None:
+            errores.append((archivo, "formato no soportado"))
+        elif not os.path.isfile(ruta_audio):
+            errores.append((archivo, "no existe"))
+        elif obtener_rubrica(area, "Servicio") is None:
+            errores.append((archivo, f"área sin rúbrica de Servicio: {area}"))
+        else:
+            grabaciones.append((archivo, ruta_audio, tipo, area, asesor))
+
+    return grabaciones, errores
+
+
+def evaluar_grabacion(grabacion, codigo, api_key, limitador):
+    archivo, ruta_audio, tipo, area, asesor = grabacion
+    with open(ruta_audio, "rb") as audio:
+        texto = transcribir_grabacion(audio, tipo, api_key, limitador)
+
+    resultados, total, _ = evaluar_transcripcion(texto, area)
+    return construir_fila_ia(area, asesor, resultados, total, codigo=codigo)
+
+
+def escribir_en_hojas(filas):
+    """Un row_values(1) y un append_rows por hoja "Área - Servicio"."""
+    creds_dict = json.loads(st.secrets["GCP_SERVICE_ACCOUNT"])
+    creds = ServiceAccountCredentials.from_json_keyfile_dict(creds_dict, SCOPE_GOOGLE)
+    sh = gspread.authorize(creds).open_by_key(st.secrets["GOOGLE_SHEETS_ID"])
+
+    por_hoja = {}
+    for fila in filas:
+        por_hoja.setdefault(f"{fila['Área']} - {fila['Canal']}", []).append(fila)
+
+    for nombre_hoja, filas_hoja in por_hoja.items():
+        hoja = sh.worksheet(nombre_hoja)
+        encabezados = hoja.row_values(1)
+        hoja.append_rows([fila_para_encabezados(f, encabezados) for f in filas_hoja])
+        print(f"✅ {nombre_hoja}: {len(filas_hoja)} filas")
+
+
+def escribir_en_archivo(filas, ruta):
+    df = pd.DataFrame(filas)
+    if ruta.lower().endswith(".parquet"):
+        df.to_parquet(ruta, index=False)
+    else:
+        df.to_csv(ruta, index=False, encoding="utf-8-sig")
+    print(f"✅ {len(df)} filas en {ruta}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("carpeta", help="carpeta con las grabaciones")
+    parser.add_argument("manifiesto", help="CSV con columnas Archivo, Área, Asesor")
+    destino = parser.add_mutually_exclusive_group(required=True)
+    destino.add_argument("--salida", help="archivo .csv o .parquet")
+    destino.add_argument("--hojas", action="store_true", help="escribe en las hojas de Google Sheets")
+    parser.add_argument("--hilos", type=int, default=GEMINI_MAX_CONCURRENCIA, help="transcripciones simultáneas")
+    args = parser.parse_args()
+
+    grabaciones, errores = leer_manifiesto(args.manifiesto, args.carpeta)
+    for archivo, error in errores:
+        print(f"⚠ {archivo}: {error}", file=sys.stderr)
+
+    api_key = st.secrets["GEMINI_API_KEY"]
+    limitador = LimitadorGemini(GEMINI_INTERVALO_MIN_SEG)
+    lote = int(time.time())
+    filas = []
+
+    with ThreadPoolExecutor(max_workers=args.hilos) as pool:
+        futuros = {
+            pool.submit(evaluar_grabacion, g, f"IA-{lote}-{i + 1}", api_key, limitador): g[0]
+            for i, g in enumerate(grabaciones)
+        }
+
+        for n, futuro in enumerate(as_completed(futuros), start=1):
+            archivo = futuros[futuro]
+            try:
+                fila = futuro.result()
+                fila["Fecha"] = fila["Fecha"].strftime("%Y-%m-%d")
+                filas.append(fila)
+                print(f"[{n}/{len(grabaciones)}] {archivo}: {fila['Total']}")
+            except Exception as e:
+                errores.append((archivo, str(e)))
+                print(f"[{n}/{len(grabaciones)}] ❌ {archivo}: {e}", file=sys.stderr)
+
+    if filas:
+        if args.hojas:
+            escribir_en_hojas(filas)
+        else:
+            escribir_en_archivo(filas, args.salida)
+
+    print(f"{len(filas)} evaluadas, {len(errores)} con error")
+    sys.exit(1 if errores else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Servidor local que imita el endpoint generateContent de Gemini, para probar
+la página 🧠 IA sin consumir cuota (aciertos/fallos de la caché, límite 429).
+
+    python gemini_local.py --puerto 8765
+    GEMINI_URL_BASE=http://127.0.0.1:8765 streamlit run app.py
+
+Cada petición generateContent se cuenta; GET /contador devuelve el total,
+así una evaluación repetida que sale de la caché no suma. También acepta
+la subida resumable de la Files API que se usa con audios grandes.
+"""
+import argparse
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+TRANSCRIPCION = (
+    "Hola, buen día, bienvenido a Casa UR. Me confirma su número de cédula, "
+    "fecha de nacimiento y correo, por favor. Entiendo. Permítame un momento. "
+    "¿Requiere algo adicional? Gracias por comunicarse, feliz día."
+)
+
+
+class ManejadorGemini(BaseHTTPRequestHandler):
+    recibidas = 0
+    lock = threading.Lock()
+    limite_cada = 0  # responde 429 cada N peticiones (0 = nunca)
+
+    def _responder(self, estado, cuerpo):
+        datos = json.dumps(cuerpo).encode("utf-8")
+        self.send_response(estado)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(datos)))
+        self.end_headers()
+        self.wfile.write(datos)
+
+    def do_GET(self):
+        if self.path == "/contador":
+            self._responder(200, {"peticiones": ManejadorGemini.recibidas})
+        else:
+            self._responder(404, {"error": {"message": "ruta no encontrada"}})
+
+    def _leer_cuerpo(self):
+        pendiente = int(self.headers.get("Content-Length", 0))
+        while pendiente > 0:
+            bloque = self.rfile.read(min(pendiente, 1024 * 1024))
+            if not bloque:
+                break
+            pendiente -= len(bloque)
+
+    def do_POST(self):
+        self._leer_cuerpo()
+
+        # Files API (subida resumable): inicio de sesión y envío del archivo
+        if self.path.startswith("/upload/"):
+            host = self.headers.get("Host")
+            self.send_response(200)
+            self.send_header("X-Goog-Upload-URL", f"http://{host}/subida/{id(self)}")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        if self.path.startswith("/subida/"):
+            self._responder(200, {"file": {
+                "uri": f"http://{self.headers.get('Host')}/v1beta/files/{self.path.rsplit('/', 1)[-1]}",
+                "mimeType": "audio/wav"
+            }})
+            return
+
+        with ManejadorGemini.lock:
+            ManejadorGemini.recibidas += 1
+            n = ManejadorGemini.recibidas
+
+        if ":generateContent" not in self.path:
+            self._responder(404, {"error": {"message": "ruta no encontrada"}})
+            return
+
+        if ManejadorGemini.limite_cada and n % ManejadorGemini.limite_cada == 0:
+            self._responder(429, {"error": {"details": [{
+                "@type": "type.googleapis.com/google.rpc.RetryInfo",
+                "retryDelay": "2s"
+            }]}})
+            return
+
+        self._responder(200, {"candidates": [{"content": {"parts": [{"text": TRANSCRIPCION}]}}]})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--puerto", type=int, default=8765)
+    parser.add_argument("--limite-cada", type=int, default=0, help="responde 429 cada N peticiones")
+    args = parser.parse_args()
+
+    ManejadorGemini.limite_cada = args.limite_cada
+    servidor = ThreadingHTTPServer(("127.0.0.1", args.puerto), ManejadorGemini)
+    print(f"Gemini local en http://127.0.0.1:{args.puerto}")
+    servidor.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""
+Métricas de rendimiento del proceso: tiempos (spans) y contadores.
+
+Vive en un módulo aparte (no en app.py, que se re-ejecuta en cada
+interacción) para que el registro sea uno solo por proceso y lo puedan usar
+también transcripcion.py y los hilos en segundo plano.
+Cada span guarda sus últimas VENTANA_MUESTRAS duraciones por página, de ahí
+salen los percentiles móviles del panel 🛠️ Rendimiento.
+"""
+import csv
+import io
+import json
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+from functools import wraps
+
+VENTANA_MUESTRAS = 1000
+PAGINA_SEGUNDO_PLANO = "(segundo plano)"
+
+_lock = threading.Lock()
+_muestras = {}          # (página, span) → deque de duraciones en ms
+_contadores = Counter()
+_contexto = threading.local()
+_inicio = time.time()
+
+# ===============================
+# REGISTRO
+# ===============================
+def fijar_pagina(pagina):
+    """Página del rerun en curso (por hilo: Streamlit ejecuta cada sesión en su hilo)."""
+    _contexto.pagina = pagina
+
+def pagina_actual():
+    return getattr(_contexto, "pagina", PAGINA_SEGUNDO_PLANO)
+
+def registrar(span, ms, pagina=None):
+    clave = (pagina or pagina_actual(), span)
+    with _lock:
+        if clave not in _muestras:
+            _muestras[clave] = deque(maxlen=VENTANA_MUESTRAS)
+        _muestras[clave].append(ms)
+
+@contextmanager
+def medir(span):
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        registrar(span, (time.perf_counter() - inicio) * 1000)
+
+def contar(nombre, n=1):
+    with _lock:
+        _contadores[nombre] += n
+
+def contado(nombre):
+    """Decorador: cuenta cada llamada (p. ej. por encima de un st.cache_* para las solicitudes)."""
+    def decorador(funcion):
+        @wraps(funcion)
+        def envoltura(*args, **kwargs):
+            contar(nombre)
+            return funcion(*args, **kwargs)
+        return envoltura
+    return decorador
+
+def reiniciar():
+    global _inicio
+    with _lock:
+        _muestras.clear()
+        _contadores.clear()
+        _inicio = time.time()
+
+# ===============================
+# CONSULTA Y EXPORTACIÓN
+# ===============================
+def _percentil(ordenadas, p):
+    return ordenadas[min(len(ordenadas) - 1, int(round(p / 100 * (len(ordenadas) - 1))))]
+
+def percentiles():
+    """Una fila por (página, span) con n, p50, p90, p99 y máximo en ms."""
+    with _lock:
+        copia = {clave: sorted(valores) for clave, valores in _muestras.items()}
+
+    return [
+        {
+            "pagina": pagina,
+            "span": span,
+            "n": len(v),
+            "p50_ms": round(_percentil(v, 50), 2),
+            "p90_ms": round(_percentil(v, 90), 2),
+            "p99_ms": round(_percentil(v, 99), 2),
+            "max_ms": round(v[-1], 2)
+        }
+        for (pagina, span), v in sorted(copia.items())
+        if v
+    ]
+
+def contadores():
+    with _lock:
+        return dict(sorted(_contadores.items()))
+
+def resumen_caches():
+    """
+    Aciertos y fallos por caché, a partir de los contadores cache_<nombre>_*:
+    - cachés propias cuentan _aciertos y _fallos
+    - las de Streamlit cuentan _solicitudes (afuera) y _fallos (adentro de la función)
+    """
+    valores = contadores()
+    nombres = sorted({
+        n[len("cache_"):].rsplit("_", 1)[0] for n in valores
+        if n.startswith("cache_") and n.rsplit("_", 1)[1] in ("aciertos", "fallos", "solicitudes")
+    })
+
+    filas = []
+    for nombre in nombres:
+        fallos = valores.get(f"cache_{nombre}_fallos", 0)
+        aciertos = valores.get(
+            f"cache_{nombre}_aciertos",
+            max(0, valores.get(f"cache_{nombre}_solicitudes", 0) - fallos)
+        )
+        total = aciertos + fallos
+        filas.append({
+            "cache": nombre,
+            "aciertos": aciertos,
+            "fallos": fallos,
+            "tasa_aciertos": round(aciertos / total, 3) if total else None
+        })
+    return filas
+
+def exportar_json(extra=None):
+    return json.dumps(
+        {
+            "desde": _inicio,
+            "generado": time.time(),
+            "percentiles": percentiles(),
+            "caches": resumen_caches(),
+            "contadores": {**contadores(), **(extra or {})}
+        },
+        ensure_ascii=False,
+        indent=2
+    )
+
+def exportar_csv(extra=None):
+    """Percentiles y contadores en una sola tabla (tipo = span | contador)."""
+    salida = io.StringIO()
+    escritor = csv.writer(salida)
+    escritor.writerow(["tipo", "pagina", "nombre", "n", "p50_ms", "p90_ms", "p99_ms", "max_ms", "valor"])
+    for fila in percentiles():
+        escritor.writerow([
+            "span", fila["pagina"], fila["span"], fila["n"],
+            fila["p50_ms"], fila["p90_ms"], fila["p99_ms"], fila["max_ms"], ""
+        ])
+    for nombre, valor in {**contadores(), **(extra or {})}.items():
+        escritor.writerow(["contador", "", nombre, "", "", "", "", "", valor])
+    return salida.getvalue()
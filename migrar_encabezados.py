@@ -0,0 +1,63 @@
+"""
+Migra los encabezados de las hojas "Área - Canal" del texto completo de cada
+pregunta a su código corto (ej. "CUR_PRES_Q07"), según rubricas.py.
+La app lee y escribe ambos formatos, así que la migración puede hacerse
+hoja por hoja y en cualquier momento.
+
+Usa las mismas credenciales que la app (.streamlit/secrets.toml):
+
+    python migrar_encabezados.py            # solo muestra los cambios
+    python migrar_encabezados.py --aplicar  # reescribe la fila 1
+"""
+import argparse
+import json
+
+import gspread
+import streamlit as st
+from oauth2client.service_account import ServiceAccountCredentials
+
+from rubricas import RUBRICAS, normalizar_encabezados
+
+SCOPE_GOOGLE = [
+    "https://spreadsheets.google.com/feeds",
+    "https://www.googleapis.com/auth/drive"
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--aplicar", action="store_true", help="escribe los encabezados nuevos")
+    args = parser.parse_args()
+
+    creds_dict = json.loads(st.secrets["GCP_SERVICE_ACCOUNT"])
+    creds = ServiceAccountCredentials.from_json_keyfile_dict(creds_dict, SCOPE_GOOGLE)
+    sh = gspread.authorize(creds).open_by_key(st.secrets["GOOGLE_SHEETS_ID"])
+
+    for ws in sh.worksheets():
+        title = ws.title.strip()
+        if " - " not in title:
+            continue
+
+        area, canal = [x.strip() for x in title.split(" - ", 1)]
+        if (area, canal) not in RUBRICAS:
+            continue
+
+        encabezados = ws.row_values(1)
+        nuevos = normalizar_encabezados(area, canal, encabezados)
+        cambios = [(a, b) for a, b in zip(encabezados, nuevos) if a != b]
+
+        if not cambios:
+            print(f"✔ {title}: sin cambios")
+            continue
+
+        print(f"→ {title}: {len(cambios)} columnas")
+        for anterior, nuevo in cambios:
+            print(f"    {nuevo:<16} ← {anterior[:70]}")
+
+        if args.aplicar:
+            ws.update(values=[nuevos], range_name="1:1")
+            print("    ✅ actualizado")
+
+
+if __name__ == "__main__":
+    main()
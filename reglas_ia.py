@@ -0,0 +1,167 @@
+"""
+Reglas de calificación automática (🧠 IA) para el canal Servicio.
+
+Cada pregunta declara sus frases por grupo, cuántos grupos deben aparecer y,
+si aplica, la ventana de caracteres desde el inicio de la llamada donde
+cuentan. Todas las frases se compilan al importar en una sola expresión
+regular, así la transcripción se recorre una vez y se obtienen todas las
+coincidencias con su posición. Texto y frases se comparan sin tildes ni
+mayúsculas ("cedula" cuenta como "cédula").
+Ajustar la calificación es editar REGLAS_SERVICIO.
+"""
+import re
+import time
+import unicodedata
+from datetime import date
+from types import MappingProxyType
+from typing import NamedTuple, Optional
+
+import metricas
+from rubricas import obtener_rubrica
+
+# ===============================
+# NORMALIZACIÓN
+# ===============================
+def normalizar_texto(texto: str) -> str:
+    """
+    Minúsculas y sin tildes, carácter por carácter, para que las posiciones
+    coincidan con las del texto original.
+    """
+    return "".join(unicodedata.normalize("NFD", c)[0] for c in unicodedata.normalize("NFC", texto).lower())
+
+# ===============================
+# DEFINICIÓN DE REGLAS
+# ===============================
+class Regla(NamedTuple):
+    grupos: tuple                   # cada grupo: frases equivalentes
+    minimo: Optional[int] = None    # grupos que deben aparecer (por defecto, todos)
+    ventana: Optional[int] = None   # la frase debe terminar antes de este carácter
+
+# Clave: sufijo del ID de la pregunta ("Q01" en CUR_SERV_Q01 y CON_SERV_Q01)
+REGLAS_SERVICIO = MappingProxyType({
+    # 1️⃣ INMEDIATEZ
+    "Q01": Regla(grupos=(("buen", "hola"),), ventana=120),
+    # 2️⃣ SALUDO Y PROTOCOLO
+    "Q02": Regla(grupos=(("casa ur", "conecta ur"), ("buen", "hola"))),
+    # 3️⃣ SEGURIDAD
+    "Q03": Regla(grupos=(("cédula", "documento"), ("fecha de nacimiento",), ("correo", "teléfono")), minimo=3),
+    # 4️⃣ ESCUCHA ACTIVA
+    "Q04": Regla(grupos=(("entiendo", "me confirma", "permítame validar"),)),
+    # 5️⃣ TIEMPOS DE ESPERA
+    "Q05": Regla(grupos=(("permítame un momento", "en línea"),)),
+    # 6️⃣ VALIDACIÓN DE CIERRE
+    "Q06": Regla(grupos=(("requiere algo adicional", "la información fue clara"),)),
+    # 7️⃣ DESPEDIDA
+    "Q07": Regla(grupos=(("gracias por comunicarse", "feliz día"),)),
+})
+
+# ===============================
+# MATCHER COMPILADO
+# ===============================
+class Coincidencia(NamedTuple):
+    frase: str      # frase normalizada
+    inicio: int
+    fin: int
+
+class Criterio(NamedTuple):
+    id: str
+    texto: str
+    puntaje: int
+    frases: tuple   # frases que activaron el criterio
+
+def _compilar_patron(reglas):
+    """
+    - Lookahead: encuentra también frases que se solapan
+    - A igual inicio la regex toma la más larga; las frases que son prefijo
+      de ella se reportan aparte (mapa frase → frases que empiezan igual)
+    """
+    frases = {
+        normalizar_texto(frase)
+        for regla in reglas.values()
+        for grupo in regla.grupos
+        for frase in grupo
+    }
+    alternativas = "|".join(re.escape(f) for f in sorted(frases, key=len, reverse=True))
+    prefijos = {f: tuple(p for p in frases if f.startswith(p)) for f in frases}
+    return re.compile(f"(?=({alternativas}))"), MappingProxyType(prefijos)
+
+_PATRON_SERVICIO, _PREFIJOS_SERVICIO = _compilar_patron(REGLAS_SERVICIO)
+
+def buscar_frases(texto: str) -> list:
+    """Todas las frases de las reglas presentes en el texto, con su posición."""
+    normalizado = normalizar_texto(texto)
+    return [
+        Coincidencia(frase, m.start(), m.start() + len(frase))
+        for m in _PATRON_SERVICIO.finditer(normalizado)
+        for frase in _PREFIJOS_SERVICIO[m.group(1)]
+    ]
+
+def evaluar_reglas(texto: str, preguntas) -> tuple:
+    """
+    Califica las preguntas (Pregunta de rubricas.py) con una sola pasada
+    sobre el texto. Las preguntas sin regla quedan en 0.
+    """
+    primeras = {}
+    for c in buscar_frases(texto):
+        primeras.setdefault(c.frase, c)
+
+    criterios = []
+    for q in preguntas:
+        regla = REGLAS_SERVICIO.get(q.id.rsplit("_", 1)[-1])
+        frases = []
+
+        if regla is not None:
+            for grupo in regla.grupos:
+                for frase in grupo:
+                    c = primeras.get(normalizar_texto(frase))
+                    if c is not None and (regla.ventana is None or c.fin <= regla.ventana):
+                        frases.append(frase)
+                        break
+
+            minimo = len(regla.grupos) if regla.minimo is None else regla.minimo
+            if len(frases) < minimo:
+                frases = []
+
+        criterios.append(Criterio(q.id, q.texto, q.peso if frases else 0, tuple(frases)))
+
+    return tuple(criterios)
+
+# ===============================
+# EVALUACIÓN SEGÚN MATRIZ OFICIAL (SERVICIO)
+# ===============================
+@metricas.medir("puntaje_ia")
+def evaluar_transcripcion(texto_llamada, area, canal="Servicio"):
+    """
+    Devuelve ({texto de la pregunta: puntaje}, total, {texto de la pregunta: frases}).
+    Las reglas por pregunta están en reglas_ia.py.
+    """
+    criterios = evaluar_reglas(texto_llamada, obtener_rubrica(area, canal).preguntas)
+
+    resultados = {c.texto: c.puntaje for c in criterios}
+    evidencias = {c.texto: ", ".join(c.frases) for c in criterios}
+    total = sum(resultados.values())
+
+    return resultados, total, evidencias
+
+def construir_fila_ia(area, asesor, resultados, total, codigo=None, canal="Servicio"):
+    """Fila para la hoja "Área - Servicio" sin crear columnas nuevas."""
+    aspectos_positivos = [p for p, v in resultados.items() if v > 0]
+    aspectos_mejorar = [p for p, v in resultados.items() if v == 0]
+
+    fila = {
+        "Área": area,
+        "Canal": canal,
+        "Monitor": "IA",
+        "Asesor": asesor,
+        "Código": codigo or f"IA-{int(time.time())}",
+        "Fecha": date.today(),
+        "Error crítico": "No",
+        "Total": total,
+        "Aspectos positivos": "\n".join(aspectos_positivos),
+        "Aspectos por Mejorar": "\n".join(aspectos_mejorar)
+    }
+
+    for q in obtener_rubrica(area, canal).preguntas:
+        fila[q.id] = resultados[q.texto]
+
+    return fila
@@ -0,0 +1,228 @@
+"""
+Rúbricas de evaluación por Área y Canal (fuente única de preguntas y pesos).
+
+El registro RUBRICAS se compila una sola vez al importar el módulo
+(app.py se re-ejecuta en cada interacción, este módulo no) y cada pregunta
+queda con un ID estable, su peso, la etiqueta envuelta para los gráficos
+y la clave del widget del formulario.
+Agregar un canal es agregar una entrada en DEFINICION_RUBRICAS.
+"""
+import textwrap
+from types import MappingProxyType
+from typing import NamedTuple
+
+# ===============================
+# SOPORTE WRAP PLOTLY
+# ===============================
+def envolver_pregunta(texto: str, ancho: int = 45) -> str:
+    if not isinstance(texto, str):
+        return str(texto)
+    return "<br>".join(textwrap.wrap(texto.strip(), width=ancho, break_long_words=False))
+
+# ===============================
+# PREGUNTAS POR CANAL
+# ===============================
+_PREGUNTAS_CASA_UR_ATENCION = [
+    "¿Atiende la interacción en el momento que se establece contacto con el(a) usuario(a)?",
+    "¿Saluda, se presenta de una forma amable y cortés, usando el dialogo de saludo y bienvenida?",
+    "¿Realiza la validación de identidad del usuario y personaliza la interacción de forma adecuada garantizando la confidencialidad de la información?",
+    "¿Escucha activamente al usuario y realiza preguntas adicionales demostrando atención y concentración?",
+    "¿Consulta todas las herramientas disponibles para estructurar la posible respuesta que se le brindará al usuario?",
+    "¿Controla los tiempos de espera informando al usuario y realizando acompañamiento cada 2 minutos?",
+    "¿Brinda respuesta de forma precisa, completa y coherente, de acuerdo a lo solicitado por el usuario?",
+    "¿Valida con el usuario si la información fue clara, completa o si requiere algún trámite adicional?",
+    "¿Documenta la atención de forma coherente según lo solicitado e informado al cliente; seleccionando las tipologías adecuadas y manejando correcta redacción y ortografía?",
+    "¿Finaliza la atención de forma amable, cortés utilizando el dialogo de cierre y despedida remitiendo al usuario a responder la encuesta de percepción?"
+]
+
+_PREGUNTAS_CASA_UR_CHAT = [
+    "¿Escucha activamente al usuario y realiza preguntas adicionales demostrando atención y concentración?",
+    "¿Consulta todas las herramientas disponibles para estructurar la posible respuesta que se le brindará al usuario?",
+    "¿Controla los tiempos de espera informando al usuario y realizando acompañamiento cada 2 minutos?",
+    "¿Brinda respuesta de forma precisa, completa y coherente, de acuerdo a lo solicitado por el usuario?",
+    "¿Valida con el usuario si la información fue clara, completa o si requiere algún trámite adicional?",
+    "¿Documenta la atención de forma coherente según lo solicitado e informado al cliente; seleccionando las tipologías adecuadas y manejando correcta redacción y ortografía?"
+]
+
+_PREGUNTAS_CASA_UR_BACK_OFFICE = [
+    "¿Cumple con el ANS establecido para el servicio?",
+    "¿Analiza correctamente la solicitud?",
+    "¿Gestiona adecuadamente en SAP/UXXI/Bizagi?",
+    "¿Respuesta eficaz de acuerdo a la solicitud radicada por el usuario?",
+    "¿Es empático al cerrar la solicitud?"
+]
+
+_PREGUNTAS_SERVICIO = [
+    "¿Atiende la interacción en el momento que se establece contacto con el(a) usuario(a)?",
+    "¿Saluda, se presenta de una forma amable y cortés, usando el dialogo de saludo y bienvenida?",
+    "¿Realiza la validación de identidad del usuario y personaliza la interacción de forma adecuada garantizando la confidencialidad de la información?",
+    "¿Escucha activamente al usuario y realiza preguntas adicionales demostrando atención y concentración?",
+    "¿Controla los tiempos de espera informando al usuario y realizando acompañamiento cada 2 minutos?",
+    "¿Valida con el usuario si la información fue clara, completa o si requiere algún trámite adicional?",
+    "¿Finaliza la atención de forma amable, cortés utilizando el dialogo de cierre y despedida remitiendo al usuario a responder la encuesta de percepción?"
+]
+
+_PREGUNTAS_CONECTA_UR_LINEA = [
+    "¿Atiende la interacción de forma oportuna en el momento que se establece el contacto?",
+    "¿Saluda y se presenta de manera amable y profesional, estableciendo un inicio cordial de la atención?",
+    "¿Realiza la validación de identidad del usuario garantizando confidencialidad y aplica protocolos de seguridad de la información?",
+    "¿Escucha activamente al usuario y formula preguntas pertinentes para un diagnóstico claro y completo?",
+    "¿Consulta y utiliza todas las herramientas de soporte disponibles (base de conocimiento, sistemas, documentación) para estructurar una respuesta adecuada?",
+    "¿Gestiona adecuadamente los tiempos de espera, manteniendo informado al usuario y realizando acompañamiento oportuno durante la interacción?",
+    "¿Sigue el flujo definido para solución o escalamiento, asegurando trazabilidad y cumplimiento de procesos internos?",
+    "¿Valida con el usuario que la información brindada es clara, completa y confirma si requiere trámites o pasos adicionales?",
+    "¿Documenta la atención en el sistema de tickets de manera coherente, seleccionando tipologías correctas y con redacción/ortografía adecuadas?",
+    "¿Finaliza la atención de forma amable y profesional, utilizando el cierre de interacción definido y remitiendo al usuario a la encuesta de satisfacción?"
+]
+
+_PREGUNTAS_CONECTA_UR_CHAT = [
+    "¿Escucha activamente al usuario y formula preguntas pertinentes para un diagnóstico claro y completo?",
+    "¿Consulta y utiliza todas las herramientas de soporte disponibles (base de conocimiento, sistemas, documentación) para estructurar una respuesta adecuada?",
+    "¿Gestiona adecuadamente los tiempos de espera, manteniendo informado al usuario y realizando acompañamiento oportuno durante la interacción?",
+    "¿Sigue el flujo definido para solución o escalamiento, asegurando trazabilidad y cumplimiento de procesos internos?",
+    "¿Valida con el usuario que la información brindada es clara, completa y confirma si requiere trámites o pasos adicionales?",
+    "¿Documenta la atención en el sistema de tickets de manera coherente, seleccionando tipologías correctas y con redacción/ortografía adecuadas?"
+]
+
+_PREGUNTAS_CONECTA_UR_SITIO = [
+    "¿Cómo califica el tiempo de respuesta de su solicitud?",
+    "¿Cómo califica la amabilidad y la actitud de servicio del técnico durante la atención brindada?",
+    "¿Cómo califica la presentación personal del técnico, incluyendo el uso adecuado de la chaqueta institucional, durante la visita?",
+    "¿El Tecnico de soporte en sitio logró solucionar su requerimiento en esta visita?",
+    "¿Qué probabilidad hay de que recomiendes los servicios de CONECTA UR a tus compañeros y amigos?"
+]
+
+# ===============================
+# DEFINICIÓN: (Área, Canal) → (preguntas, pesos)
+# ===============================
+CODIGOS_AREA = {
+    "Casa UR": "CUR",
+    "Conecta UR": "CON"
+}
+
+CODIGOS_CANAL = {
+    "Presencial": "PRES",
+    "Contact Center": "CC",
+    "Chat": "CHAT",
+    "Back Office": "BO",
+    "Servicio": "SERV",
+    "Linea": "LIN",
+    "Sitio": "SIT"
+}
+
+DEFINICION_RUBRICAS = {
+    ("Casa UR", "Presencial"): (_PREGUNTAS_CASA_UR_ATENCION, [9, 9, 9, 9, 9, 9, 14, 8, 14, 10]),
+    ("Casa UR", "Contact Center"): (_PREGUNTAS_CASA_UR_ATENCION, [9, 9, 9, 9, 9, 9, 14, 8, 14, 10]),
+    ("Casa UR", "Chat"): (_PREGUNTAS_CASA_UR_CHAT, [20, 15, 15, 15, 15, 20]),
+    ("Casa UR", "Back Office"): (_PREGUNTAS_CASA_UR_BACK_OFFICE, [20, 20, 20, 20, 20]),
+    ("Casa UR", "Servicio"): (_PREGUNTAS_SERVICIO, [15, 15, 15, 15, 10, 15, 15]),
+
+    ("Conecta UR", "Linea"): (_PREGUNTAS_CONECTA_UR_LINEA, [9, 9, 9, 9, 9, 9, 14, 8, 14, 10]),
+    ("Conecta UR", "Chat"): (_PREGUNTAS_CONECTA_UR_CHAT, [20, 15, 15, 15, 15, 20]),
+    ("Conecta UR", "Sitio"): (_PREGUNTAS_CONECTA_UR_SITIO, [20, 20, 20, 20, 20]),
+    ("Conecta UR", "Servicio"): (_PREGUNTAS_SERVICIO, [15, 15, 15, 15, 10, 15, 15])
+}
+
+# ===============================
+# REGISTRO COMPILADO
+# ===============================
+class Pregunta(NamedTuple):
+    id: str             # estable, ej. "CUR_PRES_Q07"
+    texto: str
+    peso: int
+    etiqueta: str       # texto envuelto (<br>) para los gráficos horizontales
+    clave_widget: str   # key del st.radio en el formulario
+
+class Rubrica(NamedTuple):
+    area: str
+    canal: str
+    preguntas: tuple    # tuple[Pregunta, ...] en el orden del formulario
+    textos: tuple
+    pesos: tuple
+    columnas: MappingProxyType  # encabezado (código o texto heredado) → ID
+
+def _compilar_rubricas(definicion):
+    registro = {}
+    ids = set()
+
+    for (area, canal), (textos, pesos) in definicion.items():
+        if len(textos) != len(pesos):
+            raise ValueError(
+                f"Rúbrica {area} - {canal}: {len(textos)} preguntas y {len(pesos)} pesos"
+            )
+
+        prefijo = f"{CODIGOS_AREA[area]}_{CODIGOS_CANAL[canal]}"
+        preguntas = tuple(
+            Pregunta(
+                id=f"{prefijo}_Q{i:02d}",
+                texto=texto,
+                peso=peso,
+                etiqueta=envolver_pregunta(texto, 45),
+                clave_widget=f"q_{prefijo}_Q{i:02d}"
+            )
+            for i, (texto, peso) in enumerate(zip(textos, pesos), start=1)
+        )
+
+        repetidos = ids.intersection(p.id for p in preguntas)
+        if repetidos:
+            raise ValueError(f"IDs de pregunta repetidos: {sorted(repetidos)}")
+        ids.update(p.id for p in preguntas)
+
+        columnas = {p.id: p.id for p in preguntas}
+        columnas.update({p.texto: p.id for p in preguntas})
+
+        registro[(area, canal)] = Rubrica(
+            area, canal, preguntas, tuple(textos), tuple(pesos), MappingProxyType(columnas)
+        )
+
+    return MappingProxyType(registro)
+
+RUBRICAS = _compilar_rubricas(DEFINICION_RUBRICAS)
+
+PREGUNTAS_POR_ID = MappingProxyType({
+    p.id: p for rubrica in RUBRICAS.values() for p in rubrica.preguntas
+})
+
+# ===============================
+# CONSULTAS
+# ===============================
+def obtener_rubrica(area, canal):
+    return RUBRICAS.get((area, canal))
+
+def obtener_preguntas(area, canal):
+    rubrica = RUBRICAS.get((area, canal))
+    return rubrica.textos if rubrica else None
+
+def obtener_pesos(area, canal):
+    rubrica = RUBRICAS.get((area, canal))
+    return rubrica.pesos if rubrica else ()
+
+# ===============================
+# ESQUEMA DE COLUMNAS EN LAS HOJAS
+# ===============================
+# Las columnas de puntaje usan el ID de la pregunta (ej. "CUR_PRES_Q07").
+# Las hojas con el encabezado heredado (texto completo) se siguen leyendo
+# y escribiendo igual; migrar_encabezados.py las pasa al formato corto.
+def normalizar_encabezados(area, canal, encabezados):
+    """Encabezados de una hoja → nombres internos (ID para las preguntas)."""
+    rubrica = RUBRICAS.get((area, canal))
+    columnas = rubrica.columnas if rubrica else {}
+    return [columnas.get(str(c).strip(), str(c).strip()) for c in encabezados]
+
+def fila_para_encabezados(data, encabezados):
+    """
+    Valores de un monitoreo en el orden de los encabezados de su hoja.
+    Acepta datos con ID de pregunta o con el texto completo (registros antiguos).
+    """
+    rubrica = RUBRICAS.get((data.get("Área"), data.get("Canal")))
+    columnas = rubrica.columnas if rubrica else {}
+
+    fila = []
+    for col in encabezados:
+        id_pregunta = columnas.get(str(col).strip())
+        if id_pregunta:
+            texto = PREGUNTAS_POR_ID[id_pregunta].texto
+            fila.append(data.get(id_pregunta, data.get(texto, "")))
+        else:
+            fila.append(data.get(col, ""))
+    return fila
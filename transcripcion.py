@@ -0,0 +1,387 @@
+"""
+Transcripción de grabaciones con Gemini, sin dependencias de Streamlit:
+la usan la página 🧠 IA de app.py y evaluar_grabaciones.py.
+
+- LimitadorGemini reparte turnos entre hilos y respeta el retryDelay de un 429
+- Caché en disco direccionada por contenido (audio + modelo + prompt)
+- Audios grandes por la Files API; WAV largos en tramos paralelos
+"""
+import base64
+import hashlib
+import io
+import os
+import re
+import tempfile
+import threading
+import time
+import wave
+from concurrent.futures import ThreadPoolExecutor
+from difflib import SequenceMatcher
+
+import requests
+
+import metricas
+
+# ===============================
+# GEMINI: LIMITADOR COMPARTIDO
+# ===============================
+GEMINI_URL_BASE = os.environ.get("GEMINI_URL_BASE", "https://generativelanguage.googleapis.com")
+GEMINI_MODELO = "gemini-2.5-flash-lite"
+GEMINI_PROMPT = "Transcribe este audio completamente en texto claro en español."
+GEMINI_MAX_CONCURRENCIA = 4      # transcripciones simultáneas en modo lote
+GEMINI_INTERVALO_MIN_SEG = 1.0   # separación mínima entre peticiones del proceso
+GEMINI_REINTENTOS_429 = 3
+GEMINI_INLINE_MAX_BYTES = 8 * 1024 * 1024   # por encima, Files API (subida resumable)
+GEMINI_TIMEOUT_SUBIDA_SEG = 300
+GEMINI_SEGMENTO_SEG = 120         # llamadas WAV largas: tramos de 2 minutos
+GEMINI_SOLAPE_SEG = 5             # solape entre tramos para no cortar palabras
+GEMINI_SOLAPE_MAX_PALABRAS = 40   # ventana donde se busca el texto repetido
+GEMINI_SOLAPE_MIN_PALABRAS = 3    # palabras seguidas en común para darlo por repetido
+GEMINI_SOLAPE_HOLGURA = 3         # palabras recortadas admitidas al inicio del tramo siguiente
+GEMINI_SOLAPE_HOLGURA_FINAL = 1   # ídem al final del tramo anterior (el corte recorta una palabra)
+
+class LimitadorGemini:
+    """
+    Compartido por todos los hilos y sesiones del proceso:
+    - reparte turnos separados GEMINI_INTERVALO_MIN_SEG
+    - ante un 429, pausa a todos hasta que pase el retryDelay indicado por la API
+    """
+    def __init__(self, intervalo_min):
+        self._lock = threading.Lock()
+        self._proximo = 0.0
+        self.intervalo_min = intervalo_min
+
+    def esperar_turno(self):
+        with self._lock:
+            ahora = time.time()
+            turno = max(ahora, self._proximo)
+            self._proximo = turno + self.intervalo_min
+        time.sleep(max(0.0, turno - ahora))
+
+    def pausar(self, segundos):
+        with self._lock:
+            self._proximo = max(self._proximo, time.time() + segundos)
+
+# ===============================
+# CACHÉ DE TRANSCRIPCIONES (DISCO LOCAL)
+# ===============================
+RUTA_CACHE_TRANSCRIPCIONES = os.environ.get(
+    "MONITOREO_CACHE_TRANSCRIPCIONES",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache_transcripciones")
+)
+CACHE_TRANSCRIPCIONES_MAX_BYTES = 50 * 1024 * 1024
+
+_lock_cache_transcripciones = threading.Lock()
+
+def clave_transcripcion(audio, modelo=GEMINI_MODELO, prompt=GEMINI_PROMPT):
+    """
+    Direccionada por contenido: el mismo audio con el mismo modelo y prompt
+    da la misma clave, sin importar el nombre del archivo.
+    El audio (archivo binario) se lee por bloques y se deja al inicio.
+    """
+    h = hashlib.sha256()
+    h.update(modelo.encode("utf-8") + b"\0" + prompt.encode("utf-8") + b"\0")
+    audio.seek(0)
+    for bloque in iter(lambda: audio.read(1024 * 1024), b""):
+        h.update(bloque)
+    audio.seek(0)
+    return h.hexdigest()
+
+def leer_cache_transcripcion(clave):
+    ruta = os.path.join(RUTA_CACHE_TRANSCRIPCIONES, f"{clave}.txt")
+    try:
+        with open(ruta, encoding="utf-8") as f:
+            texto = f.read()
+        os.utime(ruta)  # la fecha de modificación marca el último uso
+        return texto
+    except FileNotFoundError:
+        return None
+
+def guardar_cache_transcripcion(clave, texto):
+    """
+    - Escritura atómica (archivo temporal + os.replace)
+    - Si se supera CACHE_TRANSCRIPCIONES_MAX_BYTES, borra las menos usadas
+    """
+    with _lock_cache_transcripciones:
+        os.makedirs(RUTA_CACHE_TRANSCRIPCIONES, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=RUTA_CACHE_TRANSCRIPCIONES, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(texto)
+        os.replace(tmp, os.path.join(RUTA_CACHE_TRANSCRIPCIONES, f"{clave}.txt"))
+
+        archivos = []
+        for entrada in os.scandir(RUTA_CACHE_TRANSCRIPCIONES):
+            if entrada.name.endswith(".txt"):
+                info = entrada.stat()
+                archivos.append((info.st_mtime, info.st_size, entrada.path))
+
+        ocupado = sum(tam for _, tam, _ in archivos)
+        for _, tam, ruta in sorted(archivos):
+            if ocupado <= CACHE_TRANSCRIPCIONES_MAX_BYTES:
+                break
+            try:
+                os.remove(ruta)
+            except FileNotFoundError:
+                pass
+            ocupado -= tam
+
+# ===============================
+# FUNCIÓN TRANSCRIPCIÓN GEMINI
+# ===============================
+def _segundos_retry_gemini(response, defecto=45):
+    try:
+        for detail in response.json().get("error", {}).get("details", []):
+            if detail.get("@type") == "type.googleapis.com/google.rpc.RetryInfo":
+                return float(detail.get("retryDelay", f"{defecto}s").rstrip("s"))
+    except ValueError:
+        pass
+    return defecto
+
+def _tamano_audio(audio):
+    audio.seek(0, os.SEEK_END)
+    tamano = audio.tell()
+    audio.seek(0)
+    return tamano
+
+def _parte_audio_inline(audio, mime_type):
+    return {
+        "inline_data": {
+            "mime_type": mime_type,
+            "data": base64.b64encode(audio.read()).decode("utf-8")
+        }
+    }
+
+def _parte_audio_subida(audio, mime_type, api_key, tamano):
+    """
+    Files API en modo resumable: se abre la sesión y luego se envía el
+    archivo como cuerpo; requests lo transmite por bloques desde el objeto
+    sin armar base64 ni JSON con el audio.
+    """
+    inicio = requests.post(
+        f"{GEMINI_URL_BASE}/upload/v1beta/files?key={api_key}",
+        headers={
+            "X-Goog-Upload-Protocol": "resumable",
+            "X-Goog-Upload-Command": "start",
+            "X-Goog-Upload-Header-Content-Length": str(tamano),
+            "X-Goog-Upload-Header-Content-Type": mime_type,
+            "Content-Type": "application/json"
+        },
+        json={"file": {"display_name": getattr(audio, "name", "audio")}},
+        timeout=30
+    )
+    url_subida = inicio.headers.get("X-Goog-Upload-URL")
+    if inicio.status_code != 200 or not url_subida:
+        raise RuntimeError(f"Error al iniciar la subida a Gemini: {inicio.text}")
+
+    audio.seek(0)
+    subida = requests.post(
+        url_subida,
+        headers={
+            "Content-Length": str(tamano),
+            "X-Goog-Upload-Offset": "0",
+            "X-Goog-Upload-Command": "upload, finalize"
+        },
+        data=audio,
+        timeout=GEMINI_TIMEOUT_SUBIDA_SEG
+    )
+    if subida.status_code != 200:
+        raise RuntimeError(f"Error al subir el audio a Gemini: {subida.text}")
+
+    archivo = subida.json()["file"]
+    return {
+        "file_data": {
+            "mime_type": archivo.get("mimeType", mime_type),
+            "file_uri": archivo["uri"]
+        }
+    }
+
+def solicitar_transcripcion_gemini(audio, mime_type, api_key, limitador):
+    """
+    Transcribe una grabación (archivo binario con seek, p. ej. el de st.file_uploader).
+    No usa Streamlit, así que puede correr en hilos; los errores se lanzan
+    como RuntimeError con un mensaje para el usuario.
+    - Si el mismo audio ya se transcribió, responde desde la caché
+    - Hasta GEMINI_INLINE_MAX_BYTES va en base64 dentro del JSON;
+      por encima se sube con la Files API y se referencia por URI
+    """
+    clave = clave_transcripcion(audio)
+    texto = leer_cache_transcripcion(clave)
+    if texto is not None:
+        metricas.contar("cache_transcripciones_aciertos")
+        return texto
+    metricas.contar("cache_transcripciones_fallos")
+
+    tamano = _tamano_audio(audio)
+    if tamano <= GEMINI_INLINE_MAX_BYTES:
+        version = "v1"
+        parte_audio = _parte_audio_inline(audio, mime_type)
+    else:
+        version = "v1beta"
+        with metricas.medir("subida_gemini"):
+            parte_audio = _parte_audio_subida(audio, mime_type, api_key, tamano)
+
+    url = f"{GEMINI_URL_BASE}/{version}/models/{GEMINI_MODELO}:generateContent?key={api_key}"
+
+    headers = {"Content-Type": "application/json"}
+
+    body = {
+        "contents": [
+            {
+                "parts": [
+                    parte_audio,
+                    {
+                        "text": GEMINI_PROMPT
+                    }
+                ]
+            }
+        ]
+    }
+
+    for intento in range(GEMINI_REINTENTOS_429 + 1):
+        limitador.esperar_turno()
+        metricas.contar("gemini_llamadas")
+        if intento:
+            metricas.contar("gemini_reintentos")
+        with metricas.medir("llamada_gemini"):
+            response = requests.post(url, headers=headers, json=body, timeout=60)
+
+        # 🔥 Si se excede cuota: todos esperan el retryDelay y se reintenta
+        if response.status_code != 429:
+            break
+        metricas.contar("gemini_429")
+        limitador.pausar(_segundos_retry_gemini(response))
+
+    if response.status_code == 429:
+        raise RuntimeError("Se alcanzó el límite de uso de Gemini. Intenta nuevamente más tarde.")
+
+    if response.status_code != 200:
+        metricas.contar("gemini_errores")
+        raise RuntimeError(f"Error Gemini: {response.text}")
+
+    result = response.json()
+
+    if "candidates" not in result:
+        raise RuntimeError("Gemini no devolvió respuesta válida.")
+
+    texto = result["candidates"][0]["content"]["parts"][0]["text"]
+    guardar_cache_transcripcion(clave, texto)
+    return texto
+
+# ===============================
+# LLAMADAS LARGAS: TRAMOS WAV EN PARALELO
+# ===============================
+def segmentar_wav(audio, segmento_seg=GEMINI_SEGMENTO_SEG, solape_seg=GEMINI_SOLAPE_SEG):
+    """
+    Devuelve los tramos como (frame inicial, cantidad de frames), con
+    solape_seg segundos repetidos entre uno y el siguiente, o None si el
+    audio no es WAV o cabe en un solo tramo. Solo lee el encabezado: cada
+    tramo se lee después con leer_tramo_wav, cuando le toca transcribirse.
+    """
+    audio.seek(0)
+    try:
+        with wave.open(audio, "rb") as origen:
+            nframes, framerate = origen.getnframes(), origen.getframerate()
+    except (wave.Error, EOFError):
+        return None
+    finally:
+        audio.seek(0)
+
+    por_tramo = int(segmento_seg * framerate)
+    paso = por_tramo - int(solape_seg * framerate)
+    if nframes <= por_tramo:
+        return None
+
+    tramos = []
+    for inicio in range(0, nframes, paso):
+        tramos.append((inicio, min(por_tramo, nframes - inicio)))
+        if inicio + por_tramo >= nframes:
+            break
+    return tramos
+
+def leer_tramo_wav(audio, lock, inicio, cantidad):
+    """
+    Un tramo como WAV en memoria (BytesIO). El audio original lo comparten
+    los hilos: seek + lectura van bajo `lock`; el armado del WAV, fuera.
+    """
+    with lock:
+        audio.seek(0)
+        with wave.open(audio, "rb") as origen:
+            params = origen.getparams()
+            origen.setpos(inicio)
+            frames = origen.readframes(cantidad)
+        audio.seek(0)
+
+    tramo = io.BytesIO()
+    with wave.open(tramo, "wb") as destino:
+        destino.setparams(params)
+        destino.writeframes(frames)
+    tramo.seek(0)
+    return tramo
+
+def _palabras_normalizadas(texto):
+    return [re.sub(r"[^\w]", "", p.lower()) for p in texto.split()]
+
+def unir_transcripciones(
+    textos,
+    max_palabras=GEMINI_SOLAPE_MAX_PALABRAS,
+    min_palabras=GEMINI_SOLAPE_MIN_PALABRAS,
+    holgura=GEMINI_SOLAPE_HOLGURA,
+    holgura_final=GEMINI_SOLAPE_HOLGURA_FINAL
+):
+    """
+    Une los textos de tramos consecutivos quitando lo repetido por el solape.
+    En el corte las palabras del borde suelen salir recortadas o distintas
+    ("…de hoy señ" / "ía de hoy señor…"), así que no se exige coincidencia
+    exacta: se alinean las ventanas (sin mayúsculas ni puntuación) y se toma
+    la racha común más larga que empiece en las primeras `holgura` palabras
+    del tramo siguiente y termine a `holgura_final` palabras o menos del final
+    del texto acumulado (si no, es una frase repetida más atrás, no el solape:
+    ante la duda se prefiere repetir texto a borrarlo).
+    Lo que queda después de la racha en el texto acumulado (borde recortado)
+    se descarta y el tramo siguiente continúa tras ella.
+    """
+    palabras = []
+    for texto in textos:
+        nuevas = texto.split()
+        previas = _palabras_normalizadas(" ".join(palabras[-max_palabras:]))
+        siguientes = _palabras_normalizadas(" ".join(nuevas[:max_palabras]))
+
+        rachas = [
+            r for r in SequenceMatcher(None, previas, siguientes, autojunk=False).get_matching_blocks()
+            if r.size >= min_palabras and r.b <= holgura and len(previas) - (r.a + r.size) <= holgura_final
+        ]
+        if rachas:
+            racha = max(rachas, key=lambda r: r.size)
+            sobrantes = len(previas) - (racha.a + racha.size)
+            del palabras[len(palabras) - sobrantes:]
+            nuevas = nuevas[racha.b + racha.size:]
+
+        palabras.extend(nuevas)
+
+    return " ".join(palabras)
+
+@metricas.medir("transcripcion")
+def transcribir_grabacion(audio, mime_type, api_key, limitador):
+    """
+    Igual que solicitar_transcripcion_gemini, pero los WAV largos se parten en
+    tramos que se transcriben a la vez (el limitador compartido sigue mandando)
+    y se vuelven a unir en orden.
+    """
+    tramos = segmentar_wav(audio)
+    if not tramos:
+        return solicitar_transcripcion_gemini(audio, mime_type, api_key, limitador)
+
+    # Al pool van solo posiciones: cada hilo lee su tramo cuando le toca, así
+    # en memoria hay a lo sumo GEMINI_MAX_CONCURRENCIA tramos a la vez
+    lock = threading.Lock()
+
+    def transcribir_tramo(tramo):
+        inicio, cantidad = tramo
+        return solicitar_transcripcion_gemini(
+            leer_tramo_wav(audio, lock, inicio, cantidad), "audio/wav", api_key, limitador
+        )
+
+    with ThreadPoolExecutor(max_workers=GEMINI_MAX_CONCURRENCIA) as pool:
+        textos = list(pool.map(transcribir_tramo, tramos))
+
+    return unir_transcripciones(textos)